@@ -0,0 +1 @@
+"""Rotinas de carregamento e análise usadas pelo dashboard de performance de estudantes."""
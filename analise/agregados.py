@@ -0,0 +1,298 @@
+"""Agregados acumulados por partes, para datasets maiores que a memória.
+
+O CSV é lido em pedaços (``chunksize``) e cada pedaço só atualiza contagens
+que podem ser somadas: o histograma de cada coluna, tabelas de contagem
+conjunta entre pares de colunas (que dão as médias por grupo, as tabelas de
+contingência e as grades das densidades) e os momentos da correlação. Todos
+os gráficos do dashboard podem ser montados a partir desses agregados, sem
+nunca ter o DataFrame inteiro na memória: o pico de memória depende do
+tamanho do pedaço, não do arquivo.
+
+Os agregados ficam gravados em ``.cache`` junto com a posição (em bytes) até
+onde o CSV já foi lido e o hash desse trecho. Quando linhas novas são
+acrescentadas ao final do arquivo, só elas são lidas e somadas; se o trecho
+já lido mudou (arquivo reescrito), tudo é recalculado.
+
+As colunas inteiras do esquema são ``int8`` (``analise.dados.ler_csv`` recusa
+valores fora dessa faixa), então cada valor possível tem a sua própria casa
+no histograma (256 casas) e as contagens são exatas.
+"""
+
+import itertools
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analise.correlacao import MomentosCorrelacao, matriz_codificada
+from analise.cubo import ROTULOS_BOOLEANOS, CuboCategorico
+from analise.dados import (COLUNAS_BOOLEANAS, COLUNAS_CATEGORICAS, ESQUEMA, abrir_trecho, caminho_cache,
+                           fim_da_ultima_linha, hash_prefixo, ler_cabecalho, ler_csv, termina_em_linha_completa)
+from analise.densidade import densidade_2d, densidades_de_codigos
+from analise.estatisticas import QUANTIS_PADRAO, estatisticas_de_contagens
+from analise.histograma import HistogramaAcumulado
+
+TAMANHO_CHUNK = 500_000
+
+# Versão do formato dos agregados gravados em disco
+VERSAO_ARQUIVO = 1
+
+# Colunas inteiras (int8): o código de um valor é valor + 128
+_DESLOCAMENTO_INTEIRO = 128
+_NIVEIS_INTEIRO = 256
+
+_COLUNAS_DISCRETAS = COLUNAS_CATEGORICAS + COLUNAS_BOOLEANAS
+
+# Pares com tabela de contagem conjunta: todas as colunas contra a nota, os
+# pares de colunas categóricas (tabelas de contingência) e horas de sono x estudo
+PARES_PADRAO = list(dict.fromkeys(
+    [(c, 'Exam_Score') for c in ESQUEMA if c != 'Exam_Score']
+    + [('Sleep_Hours', 'Hours_Studied')]
+    + [(a, b) for a, b in itertools.combinations([c for c in ESQUEMA if c in _COLUNAS_DISCRETAS], 2)]
+))
+
+_cache = {}  # caminho absoluto -> agregados
+_lock = threading.Lock()
+
+
+def _n_niveis(coluna):
+    tipo = ESQUEMA[coluna]
+    if isinstance(tipo, pd.CategoricalDtype):
+        return len(tipo.categories)
+    return 2 if coluna in COLUNAS_BOOLEANAS else _NIVEIS_INTEIRO
+
+
+def _niveis(coluna):
+    """Valor correspondente a cada código da coluna."""
+    tipo = ESQUEMA[coluna]
+    if isinstance(tipo, pd.CategoricalDtype):
+        return tipo.categories
+    if coluna in COLUNAS_BOOLEANAS:
+        return pd.Index([False, True])
+    return pd.RangeIndex(-_DESLOCAMENTO_INTEIRO, _NIVEIS_INTEIRO - _DESLOCAMENTO_INTEIRO)
+
+
+def _codificar(serie):
+    """Código inteiro de cada linha (-1 para valor ausente)."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.intp)
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return serie.to_numpy().astype(np.intp)
+    codigos = serie.to_numpy().astype(np.intp) + _DESLOCAMENTO_INTEIRO
+    if len(codigos) and (codigos.min() < 0 or codigos.max() >= _NIVEIS_INTEIRO):
+        raise ValueError(f'a coluna {serie.name!r} tem valores fora da faixa de int8, que os agregados não comportam')
+    return codigos
+
+
+class Agregados:
+    """Contagens e momentos acumulados do dataset; ``atualizar`` e ``combinar`` são somas."""
+
+    def __init__(self, pares=None):
+        self.pares = list(PARES_PADRAO if pares is None else pares)
+        self.total = 0
+        self.contagens = {c: np.zeros(_n_niveis(c), dtype=np.int64) for c in ESQUEMA}
+        self.conjuntas = {(a, b): np.zeros((_n_niveis(a), _n_niveis(b)), dtype=np.int64) for a, b in self.pares}
+        self.momentos = MomentosCorrelacao.vazio(len(ESQUEMA))
+        self.columns = list(ESQUEMA)
+        self.attrs = {}
+
+    @classmethod
+    def de_dataframe(cls, df, pares=None):
+        return cls(pares).atualizar(df)
+
+    def atualizar(self, chunk):
+        """Acumula um pedaço do dataset (DataFrame com o esquema de ``analise.dados``)."""
+        codigos = {c: _codificar(chunk[c]) for c in ESQUEMA}
+        self.total += len(chunk)
+        for coluna, cod in codigos.items():
+            self.contagens[coluna] += np.bincount(cod[cod >= 0], minlength=len(self.contagens[coluna]))
+        for (a, b), tabela in self.conjuntas.items():
+            validos = (codigos[a] >= 0) & (codigos[b] >= 0)
+            celulas = codigos[a][validos] * tabela.shape[1] + codigos[b][validos]
+            tabela += np.bincount(celulas, minlength=tabela.size).reshape(tabela.shape)
+        matriz, _, centros = matriz_codificada(chunk, list(ESQUEMA))
+        self.momentos.combinar(MomentosCorrelacao.de_matriz(matriz, centros))
+        return self
+
+    def combinar(self, outro):
+        """Soma os agregados de ``outro`` (calculados sobre outras linhas) a estes."""
+        self.total += outro.total
+        for coluna in self.contagens:
+            self.contagens[coluna] += outro.contagens[coluna]
+        for par in self.conjuntas:
+            self.conjuntas[par] += outro.conjuntas[par]
+        self.momentos.combinar(outro.momentos)
+        return self
+
+    def copia(self):
+        nova = Agregados(self.pares).combinar(self)
+        nova.attrs = dict(self.attrs)
+        return nova
+
+    def salvar(self, destino):
+        """Grava os agregados (e os ``attrs`` de posição/hash) num ``.npz``."""
+        arrays = {f'contagens/{c}': v for c, v in self.contagens.items()}
+        arrays.update({f'conjunta/{a}/{b}': v for (a, b), v in self.conjuntas.items()})
+        arrays.update({f'momentos/{nome}': getattr(self.momentos, nome)
+                       for nome in ('n', 'media', 'quadrados', 'comomento')})
+        destino = Path(destino)
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        temporario = destino.with_name(destino.name + f'.{os.getpid()}.tmp')
+        with open(temporario, 'wb') as f:
+            np.savez(f, _versao=VERSAO_ARQUIVO, _total=self.total, _posicao=self.attrs['posicao'],
+                     _tamanho=self.attrs['impressao'][0], _mtime=self.attrs['impressao'][1],
+                     _sha=self.attrs['sha'], **arrays)
+        os.replace(temporario, destino)
+
+    @classmethod
+    def carregar(cls, origem):
+        """Lê agregados gravados por ``salvar``; devolve ``None`` se o arquivo for inválido."""
+        try:
+            arquivo = np.load(origem, allow_pickle=False)
+        except (OSError, ValueError):
+            return None
+        with arquivo:
+            if int(arquivo['_versao']) != VERSAO_ARQUIVO:
+                return None
+            pares = [tuple(nome.split('/')[1:]) for nome in arquivo.files if nome.startswith('conjunta/')]
+            agregados = cls(pares)
+            agregados.total = int(arquivo['_total'])
+            for c in agregados.contagens:
+                agregados.contagens[c] = arquivo[f'contagens/{c}']
+            for a, b in agregados.conjuntas:
+                agregados.conjuntas[(a, b)] = arquivo[f'conjunta/{a}/{b}']
+            agregados.momentos = MomentosCorrelacao(*(arquivo[f'momentos/{nome}'] for nome in
+                                                      ('n', 'media', 'quadrados', 'comomento')))
+            agregados.attrs.update(posicao=int(arquivo['_posicao']), sha=str(arquivo['_sha']),
+                                   impressao=(int(arquivo['_tamanho']), int(arquivo['_mtime'])))
+            agregados.attrs['versao'] = agregados.attrs['sha'][:16]
+        return agregados
+
+    # Consultas usadas pelas seções do dashboard
+
+    def conjunta(self, a, b):
+        """Tabela de contagens ``a x b`` (códigos das duas colunas)."""
+        if (a, b) in self.conjuntas:
+            return self.conjuntas[(a, b)]
+        if (b, a) in self.conjuntas:
+            return self.conjuntas[(b, a)].T
+        raise KeyError(f'os agregados não têm a tabela conjunta de {a!r} e {b!r}')
+
+    def _valores_presentes(self, coluna):
+        contagens = self.contagens[coluna]
+        presentes = np.flatnonzero(contagens)
+        return np.asarray(_niveis(coluna))[presentes], contagens[presentes]
+
+    def minimo(self, coluna):
+        return self._valores_presentes(coluna)[0].min()
+
+    def maximo(self, coluna):
+        return self._valores_presentes(coluna)[0].max()
+
+    def histograma_acumulado(self, coluna):
+        """Contagens por valor de uma coluna inteira, com as somas acumuladas (``analise.histograma``)."""
+        return HistogramaAcumulado(self.contagens[coluna], -_DESLOCAMENTO_INTEIRO)
+
+    def histograma(self, coluna, bins=10, range=None):
+        """Mesmo resultado de ``np.histogram(df[coluna], bins, range)``."""
+        return self.histograma_acumulado(coluna).histograma(bins, range)
+
+    def estatisticas_por_grupo(self, coluna_grupo, coluna_valor, quantis=QUANTIS_PADRAO, incluir_vazios=None):
+        """Mesmo resultado de ``analise.estatisticas.estatisticas_por_grupo`` sobre o dataset inteiro."""
+        if incluir_vazios is None:
+            incluir_vazios = coluna_grupo in COLUNAS_CATEGORICAS
+        tabela = self.conjunta(coluna_grupo, coluna_valor)
+        colunas = np.flatnonzero(tabela.sum(axis=0))
+        valores = np.asarray(_niveis(coluna_valor))[colunas]
+        return estatisticas_de_contagens(tabela[:, colunas], valores, _niveis(coluna_grupo),
+                                         coluna_grupo, quantis, incluir_vazios)
+
+    def cubo(self):
+        """Cubo de contagens das colunas categóricas, como ``analise.cubo.cubo_do_dataset``."""
+        discretas = [c for c in ESQUEMA if c in _COLUNAS_DISCRETAS]
+        rotulos = {c: list(ROTULOS_BOOLEANOS) if c in COLUNAS_BOOLEANAS else [str(v) for v in _niveis(c)]
+                   for c in discretas}
+        contagens = {(a, b): self.conjunta(a, b) for a, b in itertools.combinations(discretas, 2)}
+        contagens.update({(c, c): np.diag(self.contagens[c]) for c in discretas})
+        return CuboCategorico(rotulos, contagens, self.total)
+
+    def densidade_2d(self, coluna_x, coluna_y, eixo_x, eixo_y, bw_method='scott'):
+        """Densidade conjunta das duas colunas a partir da tabela de contagens (sem as linhas)."""
+        tabela = self.conjunta(coluna_x, coluna_y)
+        i, j = np.nonzero(tabela)
+        x = np.asarray(_niveis(coluna_x))[i]
+        y = np.asarray(_niveis(coluna_y))[j]
+        return densidade_2d(x, y, eixo_x, eixo_y, bw_method, pesos=tabela[i, j])
+
+    def densidades_por_grupo(self, coluna_grupo, coluna_valor, eixo, bw_method='scott'):
+        """Densidade de ``coluna_valor`` por nível de ``coluna_grupo``, como ``densidades_por_grupo``."""
+        tabela = self.conjunta(coluna_grupo, coluna_valor)
+        grupos, valores = np.nonzero(tabela)
+        densidades = densidades_de_codigos(grupos, np.asarray(_niveis(coluna_valor))[valores],
+                                           _niveis(coluna_grupo), eixo, bw_method,
+                                           pesos=tabela[grupos, valores], nome=coluna_grupo)
+        if coluna_grupo not in COLUNAS_CATEGORICAS:
+            densidades = densidades[tabela.sum(axis=1) > 0]
+        return densidades
+
+    def matriz_correlacao(self, metodo='pearson'):
+        """Correlação de Pearson a partir dos momentos acumulados."""
+        if metodo != 'pearson':
+            raise ValueError('no modo por partes só a correlação de Pearson está disponível')
+        correlacao = self.momentos.correlacao()
+        np.fill_diagonal(correlacao, 1.0)
+        return pd.DataFrame(np.clip(correlacao, -1.0, 1.0), index=self.columns, columns=self.columns)
+
+
+def _ingerir(agregados, caminho, inicio, fim, hasher, tamanho_chunk):
+    """Soma aos agregados as linhas do trecho ``[inicio, fim)`` do CSV."""
+    if fim <= inicio:
+        return
+    cabecalho = {'header': 0} if inicio == 0 else {'header': None, 'names': ler_cabecalho(caminho)}
+    with abrir_trecho(caminho, inicio, fim, hasher) as trecho:
+        for chunk in ler_csv(trecho, chunksize=tamanho_chunk, **cabecalho):
+            agregados.atualizar(chunk)
+
+
+def agregar_csv(caminho='StudentPerformanceFactors.csv', tamanho_chunk=TAMANHO_CHUNK):
+    """Agregados de um CSV lido em pedaços de ``tamanho_chunk`` linhas.
+
+    Os agregados ficam guardados no processo e em ``.cache``; a cada chamada
+    só as linhas acrescentadas desde a última leitura são processadas. Apenas
+    linhas completas (terminadas em quebra de linha) entram. A versão (hash do
+    trecho lido) fica em ``attrs['versao']``.
+    """
+    caminho = Path(caminho).resolve()
+    info = os.stat(caminho)
+    impressao = (info.st_size, info.st_mtime_ns)
+    destino = caminho_cache(caminho, '.agregados.npz')
+    with _lock:
+        agregados = _cache.get(caminho)
+        if agregados is None and destino.exists():
+            agregados = Agregados.carregar(destino)
+        if agregados is not None and agregados.attrs['impressao'] == impressao:
+            _cache[caminho] = agregados
+            return agregados
+
+        fim = fim_da_ultima_linha(caminho, impressao[0])
+        inicio = 0
+        if agregados is not None:
+            posicao = agregados.attrs['posicao']
+            if posicao <= fim and termina_em_linha_completa(caminho, posicao):
+                hasher = hash_prefixo(caminho, posicao)
+                if hasher.hexdigest() == agregados.attrs['sha']:
+                    # Trecho já lido não mudou: continua a partir dele, numa cópia
+                    # (sessões que ainda usam os agregados antigos não os veem mudar)
+                    agregados, inicio = agregados.copia(), posicao
+        if inicio == 0:
+            agregados, hasher = Agregados(), hash_prefixo(caminho, 0)
+
+        _ingerir(agregados, caminho, inicio, fim, hasher, tamanho_chunk)
+        agregados.attrs.update(posicao=fim, sha=hasher.hexdigest(), impressao=impressao,
+                               caminho=str(caminho))
+        agregados.attrs['versao'] = agregados.attrs['sha'][:16]
+        agregados.salvar(destino)
+        _cache[caminho] = agregados
+        return agregados
@@ -0,0 +1,276 @@
+"""Backend SQLite: o dataset fica num banco em disco e as seções recebem só os resultados.
+
+O CSV é carregado uma vez num arquivo SQLite em ``.cache`` (módulo
+``sqlite3`` da biblioteca padrão), com as colunas já codificadas como
+inteiros: códigos das categorias, 0/1 dos booleanos e o próprio valor das
+colunas inteiras, com ``NULL`` para valores ausentes. Cada coluna filtrável
+tem um índice ``(coluna, Exam_Score)``, que resolve os filtros e já cobre as
+contagens por grupo das notas sem ler a tabela.
+
+``Banco`` oferece a mesma interface dos ``Agregados``: cada tabela de
+contagens pedida por uma seção vira um ``GROUP BY`` e os momentos da
+correlação, uma única consulta de somas inteiras (exatas; os do banco
+inteiro já são calculados na montagem). O processo Python só recebe tabelas
+de algumas centenas de números, então a memória não cresce com o arquivo.
+Os filtros viram um ``WHERE`` com parâmetros.
+
+O banco é só lido depois de pronto (conexões ``mode=ro``, uma por thread),
+então vários processos do dashboard podem usar o mesmo arquivo. Ele é
+montado num arquivo temporário e trocado atomicamente; se o CSV mudar, é
+montado de novo por inteiro.
+"""
+
+import contextlib
+import functools
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from analise.agregados import TAMANHO_CHUNK, Agregados, _DESLOCAMENTO_INTEIRO, _n_niveis
+from analise.correlacao import MomentosCorrelacao, matriz_codificada
+from analise.cubo import CuboCategorico
+from analise.dados import (COLUNAS_BOOLEANAS, COLUNAS_CATEGORICAS, ESQUEMA, _impressao_digital, caminho_cache,
+                           hash_arquivo, ler_csv)
+from analise.filtros import COLUNAS_FILTRAVEIS, ROTULOS_FILTRAVEIS, _Contagens
+
+# Versão do formato do banco; outra versão faz o banco ser montado de novo
+VERSAO_BANCO = 1
+
+_MOMENTOS = ('n', 'media', 'quadrados', 'comomento')
+
+TABELA = 'alunos'
+
+_lock = threading.Lock()
+_conexoes = threading.local()  # por thread: caminho do banco -> (sha, conexão)
+
+
+def _nome(coluna):
+    return f'"{coluna}"'
+
+
+def _codigo_sql(coluna):
+    """Expressão SQL do código da coluna nos ``Agregados`` (as inteiras são deslocadas)."""
+    if coluna in COLUNAS_CATEGORICAS or coluna in COLUNAS_BOOLEANAS:
+        return _nome(coluna)
+    return f'{_nome(coluna)} + {_DESLOCAMENTO_INTEIRO}'
+
+
+def _valores_sql(serie):
+    """Valores da coluna como inteiros Python (``None`` para ausentes), prontos para o ``INSERT``."""
+    if serie.name in COLUNAS_CATEGORICAS:
+        codigos = serie.cat.codes.to_numpy()
+        if (codigos < 0).any():
+            return [None if c < 0 else c for c in codigos.tolist()]
+        return codigos.tolist()
+    return serie.to_numpy().astype(np.int64).tolist()
+
+
+def _ler_meta(destino):
+    """Metadados de um banco pronto, ou ``None`` se ele não existe ou é de outra versão."""
+    if not destino.exists():
+        return None
+    try:
+        with contextlib.closing(sqlite3.connect(f'{destino.as_uri()}?mode=ro', uri=True)) as conexao:
+            meta = dict(conexao.execute('SELECT chave, valor FROM meta'))
+    except sqlite3.Error:
+        return None
+    if int(meta.get('versao_banco', -1)) != VERSAO_BANCO:
+        return None
+    return {'sha': meta['sha'], 'impressao': (int(meta['tamanho']), int(meta['mtime'])),
+            'ausentes': json.loads(meta['ausentes']), 'momentos': json.loads(meta['momentos'])}
+
+
+def _montar(pedacos, destino, impressao, sha):
+    """Carrega os pedaços do dataset num banco novo (arquivo temporário trocado atomicamente pelo ``destino``)."""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + f'.{os.getpid()}.tmp')
+    temporario.unlink(missing_ok=True)
+    ausentes = set()
+    momentos = MomentosCorrelacao.vazio(len(ESQUEMA))
+    with contextlib.closing(sqlite3.connect(temporario)) as conexao:
+        conexao.execute('PRAGMA journal_mode = OFF')
+        conexao.execute('PRAGMA synchronous = OFF')
+        conexao.execute(f"CREATE TABLE {TABELA} ({', '.join(f'{_nome(c)} INTEGER' for c in ESQUEMA)})")
+        inserir = f"INSERT INTO {TABELA} VALUES ({', '.join('?' * len(ESQUEMA))})"
+        for chunk in pedacos:
+            ausentes.update(c for c in ESQUEMA if chunk[c].isna().any())
+            conexao.executemany(inserir, zip(*(_valores_sql(chunk[c]) for c in ESQUEMA)))
+            # Os momentos do banco inteiro saem já aqui, com o pedaço na memória
+            matriz, _, centros = matriz_codificada(chunk, list(ESQUEMA))
+            momentos.combinar(MomentosCorrelacao.de_matriz(matriz, centros))
+        # Índices criados depois da carga (mais rápido que mantê-los a cada INSERT)
+        for coluna in COLUNAS_FILTRAVEIS:
+            conexao.execute(f'CREATE INDEX "indice_{coluna}" ON {TABELA} ({_nome(coluna)}, "Exam_Score")')
+        conexao.execute('CREATE TABLE meta (chave TEXT PRIMARY KEY, valor TEXT)')
+        conexao.executemany('INSERT INTO meta VALUES (?, ?)', [
+            ('versao_banco', str(VERSAO_BANCO)), ('sha', sha), ('tamanho', str(impressao[0])),
+            ('mtime', str(impressao[1])), ('ausentes', json.dumps([c for c in ESQUEMA if c in ausentes])),
+            ('momentos', json.dumps({nome: getattr(momentos, nome).tolist() for nome in _MOMENTOS})),
+        ])
+        conexao.execute('ANALYZE')
+        conexao.commit()
+    os.replace(temporario, destino)  # leitores com o banco antigo aberto continuam a vê-lo inteiro
+
+
+def preparar_banco(caminho='StudentPerformanceFactors.csv', tamanho_chunk=TAMANHO_CHUNK):
+    """Caminho e metadados do banco do CSV, montando-o se ainda não existe ou se o CSV mudou."""
+    caminho = Path(caminho).resolve()
+    impressao = _impressao_digital(caminho)
+    destino = caminho_cache(caminho, '.sqlite')
+    with _lock:
+        meta = _ler_meta(destino)
+        if meta is not None and meta['impressao'] == impressao:
+            return destino, meta
+        sha = hash_arquivo(caminho)
+        if meta is None or meta['sha'] != sha:
+            _montar(ler_csv(caminho, chunksize=tamanho_chunk), destino, impressao, sha)
+        else:
+            # Arquivo apenas "tocado": atualiza a impressão guardada para não recalcular o hash
+            with contextlib.closing(sqlite3.connect(destino)) as conexao, conexao:
+                conexao.executemany('UPDATE meta SET valor = ? WHERE chave = ?',
+                                    [(str(impressao[0]), 'tamanho'), (str(impressao[1]), 'mtime')])
+        return destino, _ler_meta(destino)
+
+
+def _conexao(caminho, sha):
+    """Conexão só de leitura desta thread com o banco (reaberta se o banco foi montado de novo)."""
+    abertas = getattr(_conexoes, 'abertas', None)
+    if abertas is None:
+        abertas = _conexoes.abertas = {}
+    aberta = abertas.get(caminho)
+    if aberta is None or aberta[0] != sha:
+        if aberta is not None:
+            aberta[1].close()
+        aberta = abertas[caminho] = (sha, sqlite3.connect(f'{caminho.as_uri()}?mode=ro', uri=True))
+    return aberta[1]
+
+
+class Banco(Agregados):
+    """Dataset num banco SQLite, consultado como ``Agregados``.
+
+    Como na ``Selecao``, nada é calculado na criação além do total de
+    linhas: cada tabela de contagens é consultada na primeira vez que uma
+    seção a pede e guardada. A versão (``attrs['versao']``) é o hash do CSV
+    mais a descrição do filtro.
+    """
+
+    def __init__(self, caminho, meta, filtros=None):
+        self.caminho = caminho
+        self.meta = meta
+        self.filtros = {c: sorted(r) for c, r in sorted((filtros or {}).items()) if r}
+        condicoes, self.parametros = [], []
+        for coluna, rotulos in self.filtros.items():
+            condicoes.append(f"{_nome(coluna)} IN ({', '.join('?' * len(rotulos))})")
+            self.parametros += [ROTULOS_FILTRAVEIS[coluna].index(r) for r in rotulos]
+        self.where = ' AND '.join(condicoes)
+        self.total = self._consultar(f'SELECT COUNT(*) FROM {TABELA}{self._onde()}')[0][0]
+        self.columns = list(ESQUEMA)
+        self.pares = []
+        self.contagens = _Contagens(self._contar, lambda coluna: coluna in ESQUEMA)
+        self.conjuntas = _Contagens(lambda par: self._contar_conjunta(*par),
+                                    lambda par: len(par) == 2 and all(c in ESQUEMA for c in par))
+        descricao = ';'.join(f"{c}={','.join(r)}" for c, r in self.filtros.items())
+        self.attrs = {}
+        if meta['sha']:
+            self.attrs['versao'] = f"{meta['sha'][:16]}|{descricao}" if descricao else meta['sha'][:16]
+
+    @classmethod
+    def abrir(cls, caminho='StudentPerformanceFactors.csv'):
+        """Banco do CSV (montado na primeira vez), sem filtros."""
+        return cls(*preparar_banco(caminho))
+
+    @classmethod
+    def de_dataframe(cls, df, destino):
+        """Banco em ``destino`` com as linhas de ``df``; sem versão, como os ``Agregados.de_dataframe``."""
+        destino = Path(destino)
+        _montar([df], destino, (0, 0), '')
+        return cls(destino, _ler_meta(destino))
+
+    def filtrar(self, filtros):
+        """Mesmo banco restrito a ``{coluna: [rotulos]}``; sem filtros devolve o próprio banco."""
+        filtros = {c: r for c, r in filtros.items() if r}
+        if not filtros:
+            return self
+        return Banco(self.caminho, self.meta, {**self.filtros, **filtros})
+
+    def _onde(self, *condicoes):
+        condicoes = [c for c in (self.where, *condicoes) if c]
+        return f" WHERE {' AND '.join(condicoes)}" if condicoes else ''
+
+    def _consultar(self, sql):
+        return _conexao(self.caminho, self.meta['sha']).execute(sql, self.parametros).fetchall()
+
+    def _contar(self, coluna):
+        linhas = self._consultar(f'SELECT {_codigo_sql(coluna)}, COUNT(*) FROM {TABELA}'
+                                 f'{self._onde(f"{_nome(coluna)} IS NOT NULL")} GROUP BY 1')
+        tabela = np.zeros(_n_niveis(coluna), dtype=np.int64)
+        if linhas:
+            codigos, contagens = np.array(linhas, dtype=np.int64).T
+            tabela[codigos] = contagens
+        return tabela
+
+    def _contar_conjunta(self, a, b):
+        linhas = self._consultar(
+            f'SELECT {_codigo_sql(a)}, {_codigo_sql(b)}, COUNT(*) FROM {TABELA}'
+            f'{self._onde(f"{_nome(a)} IS NOT NULL", f"{_nome(b)} IS NOT NULL")} GROUP BY 1, 2')
+        tabela = np.zeros((_n_niveis(a), _n_niveis(b)), dtype=np.int64)
+        if linhas:
+            codigos_a, codigos_b, contagens = np.array(linhas, dtype=np.int64).T
+            tabela[codigos_a, codigos_b] = contagens
+        return tabela
+
+    def conjunta(self, a, b):
+        return self.conjuntas[(a, b)]
+
+    @functools.cached_property
+    def momentos(self):
+        """Momentos da correlação; sem filtros vêm prontos da montagem do banco.
+
+        Com filtros, uma única consulta soma, para cada padrão de valores
+        ausentes, cada coluna, o seu quadrado e o produto de cada par (os
+        valores são os de ``matriz_codificada``: código das categorias, 0/1 e
+        o valor das inteiras). Num padrão, as colunas presentes estão em todas
+        as linhas, então cada par soma só os padrões em que as duas estão.
+        """
+        if not self.filtros:
+            return MomentosCorrelacao(*(np.array(self.meta['momentos'][nome]) for nome in _MOMENTOS))
+        colunas = [_nome(c) for c in ESQUEMA]
+        bits = {c: 1 << k for k, c in enumerate(self.meta['ausentes'])}
+        padrao = ' + '.join(f'({_nome(c)} IS NULL) * {bit}' for c, bit in bits.items()) or '0'
+        expressoes = (['COUNT(*)'] + [f'SUM({x})' for x in colunas] + [f'SUM({x} * {x})' for x in colunas]
+                      + [f'SUM({x} * {y})' for i, x in enumerate(colunas) for y in colunas[i + 1:]])
+        linhas = self._consultar(f"SELECT {padrao}, {', '.join(expressoes)} FROM {TABELA}{self._onde()} GROUP BY 1")
+
+        p = len(colunas)
+        superior = np.triu_indices(p, 1)
+        n, soma, quadrados, produto = (np.zeros((p, p)) for _ in range(4))
+        for linha in linhas:
+            codigo, contagem = linha[0], linha[1]
+            valores = np.array([v or 0 for v in linha[2:]], dtype=np.float64)
+            somas, somas_quadrados = valores[:p], valores[p:2 * p]
+            presentes = np.array([not codigo & bits.get(c, 0) for c in ESQUEMA])
+            juntas = np.outer(presentes, presentes)
+            n += contagem * juntas
+            soma += somas[:, None] * juntas
+            quadrados += somas_quadrados[:, None] * juntas
+            produtos = np.diag(somas_quadrados)
+            produtos[superior] = valores[2 * p:]
+            produto += produtos + np.triu(produtos, 1).T
+        # Produtos de somas inteiras divididos por n: o co-momento sai simétrico e é
+        # exatamente zero quando uma das colunas é constante na seleção
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(n > 0, soma / n, 0.0)
+            quadrados = np.where(n > 0, quadrados - soma * soma / n, 0.0)
+            comomento = np.where(n > 0, produto - soma * soma.T / n, 0.0)
+        return MomentosCorrelacao(n, media, quadrados, comomento)
+
+    def cubo(self):
+        contagens = _Contagens(
+            lambda par: np.diag(self.contagens[par[0]]) if par[0] == par[1] else self.conjunta(*par),
+            lambda par: len(par) == 2 and all(c in COLUNAS_FILTRAVEIS for c in par),
+        )
+        return CuboCategorico({c: ROTULOS_FILTRAVEIS[c] for c in COLUNAS_FILTRAVEIS}, contagens, self.total)
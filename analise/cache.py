@@ -0,0 +1,329 @@
+"""Memorização de resultados por versão do dataset, compartilhada entre sessões.
+
+Os resultados de todas as funções decoradas com ``por_versao`` ficam num
+único ``CacheResultados`` do processo, com chave (função, versão do dataset,
+argumentos). Com filtros e parâmetros o número de variantes não tem limite,
+então o cache tem um orçamento de bytes: o tamanho de cada resultado é
+estimado ao guardar (arrays e tabelas pelo conteúdo) e, acima do orçamento,
+saem os menos usados recentemente. Um resultado maior que o orçamento inteiro
+não entra na memória (não expulsaria todos os outros para caber).
+
+Com uma pasta configurada (``configurar``), os resultados que saem da memória
+vão para o disco (pickle), com orçamento próprio, e voltam à memória quando
+pedidos de novo. As versões são hashes do conteúdo do CSV, então a pasta
+continua valendo depois de reiniciar o servidor; ela deve ser só do servidor,
+porque os arquivos são carregados com ``pickle``.
+
+Resultados que não devem sair nunca (o cubo de contagens do dataset, por
+exemplo) podem ser fixados (``fixar``): ficam fora do orçamento, um por
+função, e a versão nova de um resultado fixo substitui a anterior.
+
+Acertos (na memória e no disco), faltas e remoções ficam em ``estatisticas()``.
+"""
+
+import collections
+import functools
+import hashlib
+import os
+import pickle
+import re
+import sys
+import threading
+
+# Orçamentos padrão, em bytes (mudar com ``configurar``)
+ORCAMENTO_MEMORIA = 256 * 2**20
+ORCAMENTO_DISCO = 2**30
+
+# Versão dos arquivos no disco (mudar quando o resultado de alguma seção mudar)
+VERSAO_CACHE = 1
+
+# Valor de ``buscar`` quando não há resultado guardado (``None`` é um resultado válido)
+AUSENTE = object()
+
+
+def tamanho_em_bytes(valor, _vistos=None):
+    """Estimativa dos bytes ocupados por ``valor`` (arrays e tabelas pelo conteúdo, objetos pelos atributos)."""
+    vistos = set() if _vistos is None else _vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    if hasattr(valor, 'memory_usage'):  # DataFrame, Series, Index
+        uso = valor.memory_usage(deep=True)
+        return int(uso.sum() if hasattr(uso, 'sum') else uso)
+    if hasattr(valor, 'nbytes') and hasattr(valor, 'dtype'):  # arrays do NumPy
+        return int(valor.nbytes)
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamanho += sum(tamanho_em_bytes(k, vistos) + tamanho_em_bytes(v, vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set, frozenset)):
+        tamanho += sum(tamanho_em_bytes(v, vistos) for v in valor)
+    elif hasattr(valor, '__dict__') and not isinstance(valor, type):
+        tamanho += tamanho_em_bytes(vars(valor), vistos)
+    return tamanho
+
+
+def _prefixo(funcao):
+    """Início dos nomes dos arquivos de uma função no disco."""
+    return re.sub(r'[^\w.]', '_', funcao) + '-'
+
+
+class CacheResultados:
+    """Resultados na memória, do menos ao mais usado, até ``orcamento`` bytes; os que saem podem ir para o disco.
+
+    As chaves são tuplas ``(funcao, versao, argumentos...)``, com o nome da
+    função primeiro, para que ``remover`` encontre todos os resultados dela.
+    """
+
+    def __init__(self, orcamento=ORCAMENTO_MEMORIA, diretorio=None, orcamento_disco=ORCAMENTO_DISCO):
+        self._lock = threading.Lock()
+        self._itens = collections.OrderedDict()  # chave -> (resultado, bytes)
+        self._arquivos = collections.OrderedDict()  # nome do arquivo -> bytes
+        self._fixos = {}  # chave -> resultado, fora do orçamento
+        self.orcamento = orcamento
+        self.orcamento_disco = orcamento_disco
+        self.diretorio = None
+        self.usados = self.usados_disco = 0
+        self.acertos = self.acertos_disco = self.faltas = self.remocoes = 0
+        self.configurar(diretorio=diretorio)
+
+    def configurar(self, orcamento=None, diretorio=None, orcamento_disco=None):
+        """Muda os orçamentos ou a pasta do disco (``None`` mantém o valor atual)."""
+        with self._lock:
+            if orcamento is not None:
+                self.orcamento = orcamento
+            if orcamento_disco is not None:
+                self.orcamento_disco = orcamento_disco
+            if diretorio is not None and os.path.abspath(diretorio) != self.diretorio:
+                self.diretorio = os.path.abspath(diretorio)
+                os.makedirs(self.diretorio, exist_ok=True)
+                self._indexar_disco()
+            saindo = self._liberar()
+            self._liberar_disco()
+        self._gravar(saindo)
+
+    def _indexar_disco(self):
+        """Arquivos que já estão na pasta (de execuções anteriores), dos mais antigos aos mais recentes."""
+        self._arquivos.clear()
+        entradas = [e for e in os.scandir(self.diretorio) if e.name.endswith('.pkl') and e.is_file()]
+        for entrada in sorted(entradas, key=lambda e: e.stat().st_mtime):
+            self._arquivos[entrada.name] = entrada.stat().st_size
+        self.usados_disco = sum(self._arquivos.values())
+
+    @staticmethod
+    def _arquivo(chave):
+        resumo = hashlib.sha256(repr((VERSAO_CACHE, chave)).encode()).hexdigest()[:32]
+        return f'{_prefixo(chave[0])}{resumo}.pkl'
+
+    def buscar(self, chave):
+        """Resultado guardado para ``chave`` (na memória ou no disco), ou ``AUSENTE``."""
+        with self._lock:
+            if chave in self._fixos:
+                self.acertos += 1
+                return self._fixos[chave]
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.acertos += 1
+                return self._itens[chave][0]
+            arquivo = self._arquivo(chave) if self.diretorio else None
+            if arquivo not in self._arquivos:
+                self.faltas += 1
+                return AUSENTE
+            caminho = os.path.join(self.diretorio, arquivo)
+        resultado = self._ler(caminho, chave)
+        with self._lock:
+            if resultado is AUSENTE:
+                self.faltas += 1
+                self._esquecer_arquivo(arquivo)
+                return AUSENTE
+            self.acertos_disco += 1
+            if arquivo in self._arquivos:
+                self._arquivos.move_to_end(arquivo)
+        self.guardar(chave, resultado)
+        return resultado
+
+    @staticmethod
+    def _ler(caminho, chave):
+        try:
+            with open(caminho, 'rb') as f:
+                chave_lida, resultado = pickle.load(f)
+            os.utime(caminho)  # a ordem de uso continua valendo depois de reiniciar
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+            return AUSENTE
+        return resultado if chave_lida == chave else AUSENTE
+
+    def contem(self, chave):
+        """Indica se há resultado para ``chave``, sem contar como acerto nem falta."""
+        with self._lock:
+            return (chave in self._fixos or chave in self._itens
+                    or (self.diretorio is not None and self._arquivo(chave) in self._arquivos))
+
+    def guardar(self, chave, resultado):
+        tamanho = tamanho_em_bytes(resultado)
+        with self._lock:
+            if chave in self._itens:
+                self.usados -= self._itens.pop(chave)[1]
+            if tamanho > self.orcamento:
+                self.remocoes += 1
+                saindo = [(chave, resultado)]
+            else:
+                self._itens[chave] = (resultado, tamanho)
+                self.usados += tamanho
+                saindo = self._liberar()
+        self._gravar(saindo)
+
+    def fixar(self, chave, resultado):
+        """Guarda ``resultado`` fora do orçamento; os fixos da mesma função em outras versões saem."""
+        with self._lock:
+            for k in [k for k in self._fixos if k[0] == chave[0] and k[1] != chave[1]]:
+                del self._fixos[k]
+            self._fixos[chave] = resultado
+            if chave in self._itens:
+                self.usados -= self._itens.pop(chave)[1]
+
+    def _liberar(self):
+        """Tira da memória os menos usados até caber no orçamento; devolve os que devem ir para o disco."""
+        saindo = []
+        while self.usados > self.orcamento and self._itens:
+            chave, (resultado, tamanho) = self._itens.popitem(last=False)
+            self.usados -= tamanho
+            self.remocoes += 1
+            saindo.append((chave, resultado))
+        return saindo
+
+    def _gravar(self, saindo):
+        # Fora do lock: serializar resultados grandes leva tempo
+        if self.diretorio is None:
+            return
+        for chave, resultado in saindo:
+            arquivo = self._arquivo(chave)
+            with self._lock:
+                if arquivo in self._arquivos:
+                    continue  # veio do disco e continua lá
+            try:
+                conteudo = pickle.dumps((chave, resultado), protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                continue
+            if len(conteudo) > self.orcamento_disco:
+                continue
+            caminho = os.path.join(self.diretorio, arquivo)
+            temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                with open(temporario, 'wb') as f:
+                    f.write(conteudo)
+                os.replace(temporario, caminho)
+            except OSError:
+                continue
+            with self._lock:
+                self._esquecer_arquivo(arquivo)
+                self._arquivos[arquivo] = len(conteudo)
+                self.usados_disco += len(conteudo)
+                self._liberar_disco()
+
+    def _esquecer_arquivo(self, arquivo):
+        self.usados_disco -= self._arquivos.pop(arquivo, 0)
+
+    def _remover_arquivo(self, arquivo):
+        self._esquecer_arquivo(arquivo)
+        try:
+            os.remove(os.path.join(self.diretorio, arquivo))
+        except FileNotFoundError:
+            pass
+
+    def _liberar_disco(self):
+        while self.usados_disco > self.orcamento_disco and self._arquivos:
+            self._remover_arquivo(next(iter(self._arquivos)))
+
+    def remover(self, funcao):
+        """Tira da memória e do disco todos os resultados da função de nome ``funcao``."""
+        prefixo = _prefixo(funcao)
+        with self._lock:
+            for chave in [k for k in self._fixos if k[0] == funcao]:
+                del self._fixos[chave]
+            for chave in [k for k in self._itens if k[0] == funcao]:
+                self.usados -= self._itens.pop(chave)[1]
+            for arquivo in [a for a in self._arquivos if a.startswith(prefixo)]:
+                self._remover_arquivo(arquivo)
+
+    def esvaziar(self):
+        """Tira tudo da memória e do disco e zera os contadores."""
+        with self._lock:
+            self._itens.clear()
+            self._fixos.clear()
+            self.usados = 0
+            for arquivo in list(self._arquivos):
+                self._remover_arquivo(arquivo)
+            self.acertos = self.acertos_disco = self.faltas = self.remocoes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            return {'itens': len(self._itens), 'bytes': self.usados, 'orcamento': self.orcamento,
+                    'fixos': len(self._fixos),
+                    'arquivos': len(self._arquivos), 'bytes_disco': self.usados_disco,
+                    'orcamento_disco': self.orcamento_disco if self.diretorio else 0,
+                    'acertos': self.acertos, 'acertos_disco': self.acertos_disco,
+                    'faltas': self.faltas, 'remocoes': self.remocoes}
+
+
+# Um cache por processo, compartilhado por todas as sessões do dashboard
+resultados = CacheResultados()
+
+
+def configurar(orcamento=None, diretorio=None, orcamento_disco=None):
+    """Orçamentos (bytes) e pasta do disco do cache de resultados do processo."""
+    resultados.configurar(orcamento, diretorio, orcamento_disco)
+
+
+def estatisticas():
+    """Contadores e ocupação do cache de resultados do processo."""
+    return resultados.estatisticas()
+
+
+def por_versao(funcao):
+    """Memoriza ``funcao(df, *args)`` pela versão do dataset (``df.attrs['versao']``) e pelos argumentos.
+
+    DataFrames sem versão (por exemplo, recortes feitos na hora) não são memorizados.
+    """
+    nome = f'{funcao.__module__}.{funcao.__qualname__}'
+
+    def chave(df, args, kwargs):
+        versao = df.attrs.get('versao')
+        return None if versao is None else (nome, versao, args, tuple(sorted(kwargs.items())))
+
+    @functools.wraps(funcao)
+    def envoltorio(df, *args, **kwargs):
+        k = chave(df, args, kwargs)
+        if k is None:
+            return funcao(df, *args, **kwargs)
+        resultado = resultados.buscar(k)
+        if resultado is AUSENTE:
+            resultado = funcao(df, *args, **kwargs)
+            resultados.guardar(k, resultado)
+        return resultado
+
+    def memorizado(df, *args, **kwargs):
+        """Indica se ``funcao(df, *args, **kwargs)`` já está memorizado."""
+        k = chave(df, args, kwargs)
+        return k is not None and resultados.contem(k)
+
+    def guardar(resultado, df, *args, **kwargs):
+        """Memoriza ``resultado`` como o valor de ``funcao(df, *args, **kwargs)`` (calculado em outro lugar)."""
+        k = chave(df, args, kwargs)
+        if k is not None:
+            resultados.guardar(k, resultado)
+
+    def fixar(df, *args, **kwargs):
+        """Calcula (se ainda não estiver guardado) e fixa ``funcao(df, *args, **kwargs)`` fora do orçamento."""
+        k = chave(df, args, kwargs)
+        if k is None:
+            return funcao(df, *args, **kwargs)
+        resultado = resultados.buscar(k)
+        if resultado is AUSENTE:
+            resultado = funcao(df, *args, **kwargs)
+        resultados.fixar(k, resultado)
+        return resultado
+
+    envoltorio.limpar = functools.partial(resultados.remover, nome)
+    envoltorio.memorizado = memorizado
+    envoltorio.guardar = guardar
+    envoltorio.fixar = fixar
+    return envoltorio
@@ -0,0 +1,144 @@
+"""Matriz de correlação calculada sem modificar o DataFrame do dataset.
+
+As colunas são codificadas uma única vez numa matriz ``float32`` contígua
+(categorias ordinais viram a posição do nível: Low=0, Medium=1, High=2) e a
+correlação de Pearson sai de um único produto de matrizes (BLAS). A
+correlação de Spearman é a de Pearson sobre os postos. Valores ausentes são
+tratados como no ``DataFrame.corr``: cada par usa as linhas em que as duas
+colunas estão preenchidas.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def matriz_codificada(df, colunas=None, centros=None):
+    """Devolve ``(matriz, colunas, centros)``: as colunas numéricas, booleanas e categóricas em ``float32``.
+
+    As colunas já vêm centradas (o que não altera a correlação e evita perda
+    de precisão em ``float32``): ``centros`` é o valor subtraído de cada
+    coluna, por padrão a sua média. Valores ausentes ficam como NaN.
+    """
+    if colunas is None:
+        colunas = [c for c in df.columns
+                   if isinstance(df[c].dtype, pd.CategoricalDtype)
+                   or pd.api.types.is_numeric_dtype(df[c].dtype)]
+    matriz = np.empty((len(df), len(colunas)), dtype=np.float32, order='F')
+    calcular_centros = centros is None
+    centros = np.zeros(len(colunas)) if calcular_centros else np.asarray(centros, dtype=np.float64)
+    for j, col in enumerate(colunas):
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            valores = serie.cat.codes.to_numpy().astype(np.float64)
+            valores[valores < 0] = np.nan
+        else:
+            valores = serie.to_numpy(dtype=np.float64, na_value=np.nan)
+        if calcular_centros and not np.isnan(valores).all():
+            centros[j] = np.nanmean(valores)
+        matriz[:, j] = valores - centros[j]
+    return matriz, list(colunas), centros
+
+
+def _postos(matriz):
+    """Postos médios de cada coluna (empates recebem a média dos postos), mantendo NaN."""
+    postos = pd.DataFrame(matriz).rank(method='average').to_numpy(np.float64, copy=True)
+    postos -= np.nanmean(postos, axis=0)
+    return np.asfortranarray(postos, dtype=np.float32)
+
+
+def pearson(matriz):
+    """Correlação de Pearson entre as colunas de ``matriz`` (linhas = observações)."""
+    ausentes = np.isnan(matriz)
+    if not ausentes.any():
+        # Caso comum: um único produto X^T X
+        produto = (matriz.T @ matriz).astype(np.float64)
+        desvio = np.sqrt(np.diag(produto))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return produto / np.outer(desvio, desvio)
+
+    # Com valores ausentes cada par usa só as linhas completas; tudo continua em produtos de matrizes
+    presentes = (~ausentes).astype(np.float32)
+    x = np.where(ausentes, np.float32(0), matriz)
+    n = (presentes.T @ presentes).astype(np.float64)
+    soma = (x.T @ presentes).astype(np.float64)              # soma de x_i onde x_j existe
+    soma_quadrados = ((x * x).T @ presentes).astype(np.float64)
+    produto = (x.T @ x).astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariancia = produto - soma * soma.T / n
+        variancia_i = soma_quadrados - soma * soma / n
+        return covariancia / np.sqrt(variancia_i * variancia_i.T)
+
+
+class MomentosCorrelacao:
+    """Momentos para a correlação de Pearson que podem ser acumulados por partes.
+
+    Para cada par de colunas ``(i, j)`` guarda, sobre as linhas em que as duas
+    estão preenchidas: a quantidade de linhas ``n``, a média de ``i``
+    (``media[i, j]``), a soma dos quadrados dos desvios de ``i``
+    (``quadrados[i, j]``) e o co-momento ``comomento[i, j]``. Dois conjuntos de
+    momentos se combinam pela fórmula de Chan/Welford, sem perder precisão.
+    """
+
+    def __init__(self, n, media, quadrados, comomento):
+        self.n = n
+        self.media = media
+        self.quadrados = quadrados
+        self.comomento = comomento
+
+    @classmethod
+    def vazio(cls, p):
+        zeros = lambda: np.zeros((p, p))
+        return cls(zeros(), zeros(), zeros(), zeros())
+
+    @classmethod
+    def de_matriz(cls, matriz, centros=None):
+        """Momentos de uma matriz (linhas = observações), como a de ``matriz_codificada``.
+
+        ``centros`` é o que foi subtraído de cada coluna; as médias guardadas
+        ficam na escala original, para que partes centradas de formas
+        diferentes possam ser combinadas.
+        """
+        ausentes = np.isnan(matriz)
+        presentes = (~ausentes).astype(np.float32)
+        x = np.where(ausentes, np.float32(0), matriz)
+        n = (presentes.T @ presentes).astype(np.float64)
+        soma = (x.T @ presentes).astype(np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media = np.where(n > 0, soma / n, 0.0)
+        quadrados = ((x * x).T @ presentes).astype(np.float64) - soma * media
+        comomento = (x.T @ x).astype(np.float64) - soma * media.T
+        if centros is not None:
+            media = np.where(n > 0, media + np.asarray(centros)[:, None], 0.0)
+        return cls(n, media, quadrados, comomento)
+
+    def combinar(self, outro):
+        """Junta os momentos de ``outro`` (linhas disjuntas) nestes momentos."""
+        n = self.n + outro.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            peso = np.where(n > 0, self.n * outro.n / n, 0.0)
+            media = np.where(n > 0, (self.n * self.media + outro.n * outro.media) / n, 0.0)
+        delta = outro.media - self.media
+        self.quadrados += outro.quadrados + delta * delta * peso
+        self.comomento += outro.comomento + delta * delta.T * peso
+        self.n, self.media = n, media
+        return self
+
+    def correlacao(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.comomento / np.sqrt(self.quadrados * self.quadrados.T)
+
+
+def matriz_correlacao(df, metodo='pearson', colunas=None):
+    """Matriz de correlação (``'pearson'`` ou ``'spearman'``) como DataFrame.
+
+    Não memoriza nada: a seção que a usa (``analise.secoes.correlacao``) já é
+    memorizada por versão do dataset, dentro do orçamento do cache de resultados.
+    """
+    if metodo not in ('pearson', 'spearman'):
+        raise ValueError("metodo deve ser 'pearson' ou 'spearman'")
+    matriz, nomes, _ = matriz_codificada(df, colunas)
+    if metodo == 'spearman':
+        matriz = _postos(matriz)
+    correlacao = pearson(matriz)
+    np.fill_diagonal(correlacao, 1.0)
+    return pd.DataFrame(np.clip(correlacao, -1.0, 1.0), index=nomes, columns=nomes)
@@ -0,0 +1,128 @@
+"""Cubo de contagens conjuntas entre as colunas categóricas do dataset.
+
+As contagens de todos os pares de colunas categóricas (e booleanas) são
+calculadas uma única vez, quando o dataset é carregado. Qualquer tabela de
+contingência, com ou sem margens e normalizações, é montada a partir
+dessas contagens, sem voltar a percorrer as linhas do DataFrame.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from analise.cache import por_versao
+
+# Rótulos usados para as colunas booleanas (os mesmos do CSV)
+ROTULOS_BOOLEANOS = ['No', 'Yes']
+
+
+def _tipo_compacto(total):
+    return np.min_scalar_type(max(int(total), 0))
+
+
+def codificar_categoricas(df, colunas=None):
+    """Devolve ``{coluna: (codigos, rotulos)}`` para as colunas categóricas e booleanas."""
+    if colunas is None:
+        colunas = df.select_dtypes(include=['category', 'bool']).columns
+    codificadas = {}
+    for col in colunas:
+        serie = df[col]
+        if isinstance(serie.dtype, pd.CategoricalDtype):
+            codificadas[col] = (serie.cat.codes.to_numpy(), [str(c) for c in serie.cat.categories])
+        else:
+            codificadas[col] = (serie.to_numpy().astype(np.int8), list(ROTULOS_BOOLEANOS))
+    return codificadas
+
+
+class CuboCategorico:
+    """Contagens conjuntas de todos os pares de colunas categóricas.
+
+    ``contagens[(a, b)]`` é uma matriz ``len(rotulos[a]) x len(rotulos[b])``
+    com o número de linhas para cada combinação de valores (linhas com valor
+    ausente em ``a`` ou ``b`` não entram, como no ``pd.crosstab``).
+    """
+
+    def __init__(self, rotulos, contagens, total):
+        self.rotulos = rotulos
+        self.contagens = contagens
+        self.total = total
+
+    @classmethod
+    def construir(cls, df, colunas=None):
+        codificadas = codificar_categoricas(df, colunas)
+        rotulos = {col: r for col, (_, r) in codificadas.items()}
+        tipo = _tipo_compacto(len(df))
+        contagens = {}
+        for a, b in itertools.combinations(codificadas, 2):
+            codigos_a, rotulos_a = codificadas[a]
+            codigos_b, rotulos_b = codificadas[b]
+            validos = (codigos_a >= 0) & (codigos_b >= 0)
+            celula = codigos_a[validos].astype(np.intp) * len(rotulos_b) + codigos_b[validos]
+            tabela = np.bincount(celula, minlength=len(rotulos_a) * len(rotulos_b))
+            contagens[(a, b)] = tabela.reshape(len(rotulos_a), len(rotulos_b)).astype(tipo)
+        for col, (codigos, r) in codificadas.items():
+            contagens[(col, col)] = np.diag(np.bincount(codigos[codigos >= 0], minlength=len(r))).astype(tipo)
+        return cls(rotulos, contagens, len(df))
+
+    def conjunta(self, linha, coluna):
+        """Matriz de contagens ``linha x coluna`` (sem margens)."""
+        if (linha, coluna) in self.contagens:
+            return self.contagens[(linha, coluna)]
+        if (coluna, linha) in self.contagens:
+            return self.contagens[(coluna, linha)].T
+        raise KeyError(f'o cubo não tem as colunas {linha!r} e {coluna!r}')
+
+    def contagem(self, coluna):
+        """Quantidade de linhas para cada valor de ``coluna``."""
+        return pd.Series(np.diag(self.contagens[(coluna, coluna)]), index=self.rotulos[coluna], name=coluna)
+
+    def crosstab(self, linha, coluna, normalize=False, margins=False, margins_name='All'):
+        """Equivalente a ``pd.crosstab(df[linha], df[coluna], ...)``, calculado só a partir do cubo."""
+        valores = self.conjunta(linha, coluna).astype(np.int64)
+        indice = list(self.rotulos[linha])
+        colunas = list(self.rotulos[coluna])
+
+        if margins:
+            # Margens como no pandas: soma das linhas, das colunas e total geral
+            valores = np.vstack([
+                np.hstack([valores, valores.sum(axis=1, keepdims=True)]),
+                np.append(valores.sum(axis=0), valores.sum()),
+            ])
+            indice.append(margins_name)
+            colunas.append(margins_name)
+
+        # Linhas ou colunas sem nenhuma contagem (dataset filtrado) ficam NaN
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if normalize is True or normalize == 'all':
+                total = valores[-1, -1] if margins else valores.sum()
+                valores = valores / total
+            elif normalize == 'index':
+                if margins:
+                    valores = valores[:, :-1]
+                    colunas = colunas[:-1]
+                valores = valores / valores.sum(axis=1, keepdims=True)
+            elif normalize == 'columns':
+                if margins:
+                    valores = valores[:-1]
+                    indice = indice[:-1]
+                valores = valores / valores.sum(axis=0, keepdims=True)
+            elif normalize is not False:
+                raise ValueError("normalize deve ser False, True, 'all', 'index' ou 'columns'")
+
+        return pd.DataFrame(
+            valores,
+            index=pd.Index(indice, name=linha),
+            columns=pd.Index(colunas, name=coluna),
+        )
+
+
+@por_versao
+def cubo_do_dataset(df):
+    """Cubo do dataset carregado, construído uma vez por versão e compartilhado entre sessões.
+
+    O dashboard monta e fixa o cubo ao carregar cada versão
+    (``analise.pre_calculo.pre_calcular_em_segundo_plano``), de modo que ele
+    não sai do cache de resultados por falta de espaço.
+    """
+    return CuboCategorico.construir(df)
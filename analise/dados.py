@@ -0,0 +1,312 @@
+"""Carregamento do dataset com esquema explícito e cache em disco/memória.
+
+O CSV é lido uma única vez: na primeira carga gravamos um arquivo ``.npz``
+com as colunas já tipadas (códigos das categorias, inteiros pequenos e
+booleanos) e, enquanto o CSV não mudar, as próximas cargas leem esse
+arquivo. Além disso o DataFrame fica guardado em memória no processo, de
+forma que todas as sessões do Streamlit compartilham o mesmo objeto.
+
+A representação compacta (``compactar``) usa um byte por valor: códigos
+``int8`` para as categorias, ``bool`` e ``int8`` para as colunas numéricas
+do esquema. As colunas inteiras são lidas em ``int64`` e só então reduzidas,
+em pedaços, para que um valor fora da faixa não seja truncado em silêncio:
+ele é recusado com ``ValueError`` já na leitura, porque os agregados, os
+índices de bitmap e o banco SQLite têm uma casa para cada valor de ``int8``.
+Colunas fora do esquema ficam com o menor inteiro que comporta os valores.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Ordem das categorias ordinais
+NIVEIS = ['Low', 'Medium', 'High']
+
+# Esquema das 20 colunas do dataset
+ESQUEMA = {
+    'Hours_Studied': 'int8',
+    'Attendance': 'int8',
+    'Parental_Involvement': pd.CategoricalDtype(NIVEIS, ordered=True),
+    'Access_to_Resources': pd.CategoricalDtype(NIVEIS, ordered=True),
+    'Extracurricular_Activities': 'bool',
+    'Sleep_Hours': 'int8',
+    'Previous_Scores': 'int8',
+    'Motivation_Level': pd.CategoricalDtype(NIVEIS, ordered=True),
+    'Internet_Access': 'bool',
+    'Tutoring_Sessions': 'int8',
+    'Family_Income': pd.CategoricalDtype(NIVEIS, ordered=True),
+    'Teacher_Quality': pd.CategoricalDtype(NIVEIS, ordered=True),
+    'School_Type': pd.CategoricalDtype(['Public', 'Private']),
+    'Peer_Influence': pd.CategoricalDtype(['Negative', 'Neutral', 'Positive'], ordered=True),
+    'Physical_Activity': 'int8',
+    'Learning_Disabilities': 'bool',
+    'Parental_Education_Level': pd.CategoricalDtype(['High School', 'College', 'Postgraduate'], ordered=True),
+    'Distance_from_Home': pd.CategoricalDtype(['Near', 'Moderate', 'Far'], ordered=True),
+    'Gender': pd.CategoricalDtype(['Male', 'Female']),
+    'Exam_Score': 'int8',
+}
+
+COLUNAS_CATEGORICAS = [c for c, t in ESQUEMA.items() if isinstance(t, pd.CategoricalDtype)]
+COLUNAS_BOOLEANAS = [c for c, t in ESQUEMA.items() if t == 'bool']
+COLUNAS_NUMERICAS = [c for c, t in ESQUEMA.items() if c not in COLUNAS_CATEGORICAS and c not in COLUNAS_BOOLEANAS]
+
+# Versão do formato do arquivo em cache (mudar quando o esquema mudar)
+VERSAO_CACHE = 1
+
+# Linhas lidas de cada vez antes da compactação (limita o pico das colunas em int64)
+TAMANHO_LEITURA = 1_000_000
+
+_TIPOS_LEITURA = {c: ('int64' if c in COLUNAS_NUMERICAS else t) for c, t in ESQUEMA.items()}
+
+_cache = {}  # caminho absoluto -> (impressão digital, DataFrame, hash do CSV)
+_lock = threading.Lock()
+
+
+def inteiro_minimo(valores):
+    """Menor tipo inteiro com sinal que comporta ``valores``."""
+    if len(valores) == 0:
+        return np.dtype(np.int8)
+    minimo, maximo = int(valores.min()), int(valores.max())
+    for tipo in (np.int8, np.int16, np.int32):
+        faixa = np.iinfo(tipo)
+        if faixa.min <= minimo and maximo <= faixa.max:
+            return np.dtype(tipo)
+    return np.dtype(np.int64)
+
+
+def compactar(df):
+    """Converte ``df`` para a representação compacta do esquema.
+
+    Aceita tanto um DataFrame lido sem esquema (textos e ``int64``) quanto um
+    já tipado; valores inteiros fora da faixa do esquema dão ``ValueError``.
+    Colunas fora do esquema também são reduzidas: inteiros para a menor
+    largura e textos com poucos valores distintos para categorias.
+    """
+    colunas = {}
+    for coluna in df.columns:
+        serie = df[coluna]
+        tipo = ESQUEMA.get(coluna)
+        if isinstance(tipo, pd.CategoricalDtype):
+            serie = serie.astype(tipo)
+        elif tipo == 'bool' and not pd.api.types.is_bool_dtype(serie.dtype):
+            serie = serie.map({'Yes': True, 'No': False}).astype(bool)
+        elif pd.api.types.is_integer_dtype(serie.dtype):
+            largura = inteiro_minimo(serie.to_numpy())
+            if tipo is not None and largura.itemsize > np.dtype(tipo).itemsize:
+                faixa = np.iinfo(tipo)
+                raise ValueError(f'a coluna {coluna!r} tem valores entre {serie.min()} e {serie.max()}, '
+                                 f'fora da faixa do esquema ({faixa.min} a {faixa.max})')
+            serie = serie.astype(tipo if tipo is not None else largura)
+        elif tipo is None and pd.api.types.is_string_dtype(serie.dtype) and serie.nunique() <= len(serie) // 2:
+            serie = serie.astype('category')
+        colunas[coluna] = serie
+    compacto = pd.DataFrame(colunas, copy=False)
+    compacto.attrs = dict(df.attrs)
+    return compacto
+
+
+def ler_csv(origem, chunksize=None, **kwargs):
+    """Lê um CSV (caminho ou buffer) já aplicando o esquema do dataset, na representação compacta.
+
+    Com ``chunksize``, devolve um iterador de pedaços compactados.
+    """
+    leitor = pd.read_csv(origem, dtype=_TIPOS_LEITURA, true_values=['Yes'], false_values=['No'],
+                         chunksize=chunksize or TAMANHO_LEITURA, **kwargs)
+    if chunksize is not None:
+        return (compactar(pedaco) for pedaco in leitor)
+    with leitor:
+        pedacos = [compactar(pedaco) for pedaco in leitor]
+    if not pedacos:
+        # Só o cabeçalho
+        return compactar(pd.read_csv(origem, dtype=_TIPOS_LEITURA, nrows=0, **kwargs))
+    # Pedaços com larguras diferentes ficam com a maior delas
+    return pedacos[0] if len(pedacos) == 1 else pd.concat(pedacos, ignore_index=True)
+
+
+def hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """SHA-256 do conteúdo do arquivo."""
+    return hash_prefixo(caminho, os.path.getsize(caminho), tamanho_bloco).hexdigest()
+
+
+def hash_prefixo(caminho, tamanho, tamanho_bloco=1 << 20):
+    """Objeto SHA-256 com os primeiros ``tamanho`` bytes do arquivo (pode continuar recebendo bytes)."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        restante = tamanho
+        while restante > 0:
+            bloco = f.read(min(tamanho_bloco, restante))
+            if not bloco:
+                break
+            h.update(bloco)
+            restante -= len(bloco)
+    return h
+
+
+def ler_cabecalho(caminho):
+    """Nomes das colunas, tirados da primeira linha do CSV."""
+    with open(caminho, encoding='utf-8') as f:
+        return f.readline().strip().split(',')
+
+
+def fim_da_ultima_linha(caminho, tamanho, tamanho_bloco=1 << 16):
+    """Posição logo após a última quebra de linha do arquivo (linhas incompletas ficam para depois)."""
+    with open(caminho, 'rb') as f:
+        fim = tamanho
+        while fim > 0:
+            inicio = max(0, fim - tamanho_bloco)
+            f.seek(inicio)
+            posicao = f.read(fim - inicio).rfind(b'\n')
+            if posicao >= 0:
+                return inicio + posicao + 1
+            fim = inicio
+    return 0
+
+
+def termina_em_linha_completa(caminho, posicao):
+    """Indica se o byte anterior a ``posicao`` é uma quebra de linha (ou se ``posicao`` é 0)."""
+    if posicao == 0:
+        return True
+    with open(caminho, 'rb') as f:
+        f.seek(posicao - 1)
+        return f.read(1) == b'\n'
+
+
+class _Trecho(io.RawIOBase):
+    """Intervalo de bytes de um arquivo, lido como um arquivo próprio e somado a um hash."""
+
+    def __init__(self, arquivo, tamanho, hasher):
+        self._arquivo = arquivo
+        self._restante = tamanho
+        self._hasher = hasher
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._restante <= 0:
+            return 0
+        visao = memoryview(buffer)[:min(len(buffer), self._restante)]
+        lidos = self._arquivo.readinto(visao)
+        if lidos:
+            self._hasher.update(visao[:lidos])
+            self._restante -= lidos
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+def abrir_trecho(caminho, inicio, fim, hasher):
+    """Abre os bytes ``[inicio, fim)`` do arquivo; tudo que for lido é somado a ``hasher``."""
+    arquivo = open(caminho, 'rb')
+    arquivo.seek(inicio)
+    return io.BufferedReader(_Trecho(arquivo, fim - inicio, hasher))
+
+
+def caminho_cache(caminho_csv, sufixo='.npz'):
+    """Caminho de um arquivo auxiliar do CSV dentro da pasta ``.cache``."""
+    caminho_csv = Path(caminho_csv)
+    return caminho_csv.parent / '.cache' / (caminho_csv.stem + sufixo)
+
+
+def _impressao_digital(caminho):
+    info = os.stat(caminho)
+    return info.st_size, info.st_mtime_ns
+
+
+def _gravar_npz(df, destino, tamanho, mtime, sha):
+    colunas = {}
+    for col in df.columns:
+        serie = df[col]
+        colunas[col] = serie.cat.codes.to_numpy() if col in COLUNAS_CATEGORICAS else serie.to_numpy()
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + f'.{os.getpid()}.tmp')
+    with open(temporario, 'wb') as f:
+        np.savez(f, _versao=VERSAO_CACHE, _tamanho=tamanho, _mtime=mtime, _sha=sha, **colunas)
+    os.replace(temporario, destino)  # troca atômica, leitores nunca veem um arquivo pela metade
+
+
+def _ler_npz(origem):
+    """Lê o cache em disco; devolve ``(df, (tamanho, mtime), sha)`` ou ``None`` se for inválido."""
+    try:
+        arquivo = np.load(origem, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    with arquivo:
+        if int(arquivo['_versao']) != VERSAO_CACHE:
+            return None
+        colunas = {}
+        for col, tipo in ESQUEMA.items():
+            valores = arquivo[col]
+            if isinstance(tipo, pd.CategoricalDtype):
+                colunas[col] = pd.Categorical.from_codes(valores, dtype=tipo)
+            else:
+                colunas[col] = valores
+        impressao = (int(arquivo['_tamanho']), int(arquivo['_mtime']))
+        return pd.DataFrame(colunas), impressao, str(arquivo['_sha'])
+
+
+def carregar_dados(caminho='StudentPerformanceFactors.csv'):
+    """Devolve o dataset tipado, usando o cache em memória ou em disco quando possível.
+
+    Se o CSV só recebeu linhas novas no final (o hash do trecho antigo não
+    mudou), apenas essas linhas são lidas e juntadas ao que já estava
+    carregado; se o arquivo foi reescrito, ele é lido de novo por inteiro.
+    Só entram linhas completas: uma linha ainda sendo escrita no final do
+    arquivo fica para a próxima carga.
+
+    O DataFrame devolvido é compartilhado entre todas as sessões e não deve ser
+    modificado; quem precisar alterar colunas deve trabalhar sobre uma cópia.
+    A versão do dataset (hash do CSV) fica em ``df.attrs['versao']``.
+    """
+    caminho = Path(caminho).resolve()
+    tamanho, mtime = _impressao_digital(caminho)
+
+    with _lock:
+        anterior = _cache.get(caminho)
+        if anterior is not None and anterior[0] == (tamanho, mtime):
+            return anterior[1]
+
+        destino = caminho_cache(caminho)
+        if anterior is None and destino.exists():
+            lido = _ler_npz(destino)
+            if lido is not None:
+                df, impressao, sha = lido
+                anterior = (impressao, df, sha)
+
+        # O tamanho guardado é o das linhas completas, não o do arquivo
+        fim = fim_da_ultima_linha(caminho, tamanho)
+        df = None
+        if anterior is not None:
+            (tamanho_antigo, mtime_antigo), df_antigo, sha_antigo = anterior
+            if fim == tamanho_antigo and (mtime == mtime_antigo
+                                          or hash_prefixo(caminho, fim).hexdigest() == sha_antigo):
+                # Arquivo apenas "tocado": atualiza o mtime guardado para não recalcular o hash
+                df, sha = df_antigo, sha_antigo
+            elif fim > tamanho_antigo and termina_em_linha_completa(caminho, tamanho_antigo):
+                hasher = hash_prefixo(caminho, tamanho_antigo)
+                if hasher.hexdigest() == sha_antigo:
+                    # Só linhas novas no final: lê apenas o trecho acrescentado
+                    with abrir_trecho(caminho, tamanho_antigo, fim, hasher) as trecho:
+                        novos = ler_csv(trecho, header=None, names=ler_cabecalho(caminho))
+                    df = pd.concat([df_antigo, novos], ignore_index=True)
+                    sha = hasher.hexdigest()
+
+        if df is None:
+            hasher = hashlib.sha256()
+            with abrir_trecho(caminho, 0, fim, hasher) as trecho:
+                df = ler_csv(trecho)
+            sha = hasher.hexdigest()
+        if anterior is None or anterior[0] != (fim, mtime):
+            _gravar_npz(df, destino, fim, mtime, sha)
+
+        df.attrs['versao'] = sha[:16]
+        df.attrs['caminho'] = str(caminho)
+        _cache[caminho] = ((fim, mtime), df, sha)
+        return df
@@ -0,0 +1,222 @@
+"""Estimativa de densidade por kernel (KDE) com binning linear e convolução via FFT.
+
+O ``gaussian_kde`` do SciPy soma a contribuição de cada amostra em cada ponto
+da grade, o que custa O(n * pontos). Aqui as amostras são distribuídas
+(binning linear) numa grade regular mais fina que a de saída, a grade é
+convoluída com o kernel gaussiano via FFT e o resultado é lido nos pontos
+pedidos. O custo passa a ser O(n + grade * log(grade)).
+
+As larguras de banda seguem as mesmas regras do ``gaussian_kde`` (Scott,
+Silverman ou um fator numérico), com a covariância completa dos dados.
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from analise.interrupcao import verificar
+
+# Espaçamento máximo da grade interna em relação ao desvio do kernel
+SUBDIVISOES_POR_BANDA = 8
+# O kernel é truncado a partir desse número de desvios
+ALCANCE_KERNEL = 5.0
+# Amostras distribuídas na grade de cada vez (entre um pedaço e outro o cálculo pode ser cancelado)
+AMOSTRAS_POR_PEDACO = 1_000_000
+
+
+def fator_banda(n, d, bw_method='scott'):
+    """Fator multiplicativo da covariância dos dados, como em ``gaussian_kde.factor``."""
+    if bw_method is None or bw_method == 'scott':
+        return n ** (-1.0 / (d + 4))
+    if bw_method == 'silverman':
+        return (n * (d + 2) / 4.0) ** (-1.0 / (d + 4))
+    if np.isscalar(bw_method) and not isinstance(bw_method, str):
+        return float(bw_method)
+    raise ValueError("bw_method deve ser 'scott', 'silverman' ou um número")
+
+
+def covariancia_kernel(amostras, bw_method='scott', pesos=None):
+    """Covariância do kernel gaussiano para amostras com forma ``(d, n)``.
+
+    ``pesos`` são contagens inteiras (cada amostra vale por ``pesos[i]`` linhas).
+    """
+    d = amostras.shape[0]
+    n = amostras.shape[1] if pesos is None else int(np.sum(pesos))
+    covariancia = np.atleast_2d(np.cov(amostras, rowvar=True, bias=False, fweights=pesos))
+    return covariancia * fator_banda(n, d, bw_method) ** 2
+
+
+def _eixo_interno(eixo, desvio):
+    """Grade interna alinhada com ``eixo``: devolve ``(origem, passo, tamanho, salto, margem)``.
+
+    ``salto`` é de quantos em quantos nós internos está um ponto do eixo de
+    saída e ``margem`` quantos nós existem antes do primeiro ponto pedido.
+    """
+    eixo = np.asarray(eixo, dtype=np.float64)
+    if len(eixo) > 1:
+        espacamento = (eixo[-1] - eixo[0]) / (len(eixo) - 1)
+        if not np.allclose(np.diff(eixo), espacamento, rtol=1e-6, atol=1e-12):
+            raise ValueError('os eixos de avaliação precisam ser uniformes (como np.linspace)')
+        salto = max(1, int(np.ceil(espacamento * SUBDIVISOES_POR_BANDA / desvio)))
+        passo = espacamento / salto
+    else:
+        salto, passo = 1, desvio / SUBDIVISOES_POR_BANDA
+    margem = int(np.ceil(ALCANCE_KERNEL * desvio / passo))
+    tamanho = (len(eixo) - 1) * salto + 1 + 2 * margem
+    return eixo[0] - margem * passo, passo, tamanho, salto, margem
+
+
+def binning_linear(amostras, origens, passos, tamanhos, pesos=None):
+    """Distribui cada amostra entre os nós vizinhos de uma grade regular d-dimensional.
+
+    Amostras fora da grade são descartadas (elas ficariam além do alcance do kernel).
+    As amostras são processadas em pedaços de ``AMOSTRAS_POR_PEDACO``, o que
+    limita a memória temporária e permite cancelar o cálculo no meio.
+    """
+    grade = np.zeros(tamanhos)
+    for inicio in range(0, amostras.shape[1], AMOSTRAS_POR_PEDACO):
+        verificar()
+        fim = inicio + AMOSTRAS_POR_PEDACO
+        grade += _binning_pedaco(amostras[:, inicio:fim], origens, passos, tamanhos,
+                                 None if pesos is None else pesos[inicio:fim])
+    return grade
+
+
+def _binning_pedaco(amostras, origens, passos, tamanhos, pesos):
+    d = len(tamanhos)
+    posicoes = (amostras - np.asarray(origens)[:, None]) / np.asarray(passos)[:, None]
+    base = np.floor(posicoes)
+    dentro = np.all((base >= 0) & (base < np.asarray(tamanhos)[:, None] - 1), axis=0)
+    if not dentro.all():
+        posicoes, base = posicoes[:, dentro], base[:, dentro]
+        if pesos is not None:
+            pesos = pesos[dentro]
+    fracao = posicoes - base
+    base = base.astype(np.intp)
+    pesos = np.ones(base.shape[1]) if pesos is None else np.asarray(pesos, dtype=np.float64)
+
+    total = int(np.prod(tamanhos))
+    grade = np.zeros(total)
+    for canto in itertools.product((0, 1), repeat=d):
+        indice = np.ravel_multi_index(tuple(base[i] + canto[i] for i in range(d)), tamanhos)
+        peso = pesos.copy()
+        for i in range(d):
+            peso *= fracao[i] if canto[i] else 1.0 - fracao[i]
+        grade += np.bincount(indice, weights=peso, minlength=total)
+    return grade.reshape(tamanhos)
+
+
+def _kernel_discreto(covariancia, passos, margens):
+    deslocamentos = [np.arange(-m, m + 1) * p for m, p in zip(margens, passos)]
+    malha = np.stack(np.meshgrid(*deslocamentos, indexing='ij'), axis=-1)
+    inversa = np.linalg.inv(covariancia)
+    expoente = np.einsum('...i,ij,...j->...', malha, inversa, malha)
+    normalizacao = np.sqrt(np.linalg.det(2 * np.pi * covariancia))
+    return np.exp(-0.5 * expoente) / normalizacao
+
+
+def densidade_grade(amostras, eixos, bw_method='scott', pesos=None):
+    """Densidade KDE de ``amostras`` (forma ``(d, n)``) nos nós do produto dos ``eixos``.
+
+    Cada eixo deve ser uniforme. O resultado tem forma ``(len(eixos[0]), ..., len(eixos[-1]))``.
+    ``pesos`` são contagens inteiras por amostra: com eles as amostras podem ser
+    os valores distintos de uma tabela de contagens em vez das linhas.
+    """
+    amostras = np.atleast_2d(np.asarray(amostras, dtype=np.float64))
+    d = amostras.shape[0]
+    if len(eixos) != d:
+        raise ValueError('é preciso um eixo de avaliação por dimensão das amostras')
+    covariancia = covariancia_kernel(amostras, bw_method, pesos)
+    n = amostras.shape[1] if pesos is None else np.sum(pesos)
+
+    internos = [_eixo_interno(eixo, np.sqrt(covariancia[i, i])) for i, eixo in enumerate(eixos)]
+    origens, passos, tamanhos, saltos, margens = (list(v) for v in zip(*internos))
+
+    # O scipy.signal leva mais de um segundo para importar: só na primeira densidade
+    from scipy.signal import fftconvolve
+
+    grade = binning_linear(amostras, origens, passos, tamanhos, pesos)
+    kernel = _kernel_discreto(covariancia, passos, margens)
+    suavizada = fftconvolve(grade, kernel, mode='same')
+
+    fatias = tuple(slice(m, m + (len(e) - 1) * s + 1, s) for m, s, e in zip(margens, saltos, eixos))
+    return np.clip(suavizada[fatias], 0.0, None) / n
+
+
+def densidade_2d(x, y, eixo_x, eixo_y, bw_method='scott', pesos=None):
+    """Densidade conjunta de ``(x, y)`` numa malha, no formato de ``np.meshgrid(eixo_x, eixo_y)``.
+
+    Substitui ``gaussian_kde(np.vstack([x, y]))`` avaliado na malha: o
+    resultado tem forma ``(len(eixo_y), len(eixo_x))``.
+    """
+    amostras = np.vstack([np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)])
+    return densidade_grade(amostras, [eixo_x, eixo_y], bw_method, pesos).T
+
+
+def densidades_por_grupo(df, coluna_grupo, coluna_valor, eixo, bw_method='scott'):
+    """Densidade KDE 1-D de ``coluna_valor`` para cada nível de ``coluna_grupo``, numa única passada.
+
+    Todos os grupos são distribuídos na mesma grade interna (uma linha por
+    grupo) e convoluídos de uma vez, cada um com a sua própria largura de
+    banda, como se fosse um ``gaussian_kde`` por grupo. Para ver um trecho
+    com mais detalhe basta passar um ``eixo`` restrito a esse trecho: ele é
+    avaliado com resolução completa, sem recortar uma grade maior.
+
+    Devolve um DataFrame com um nível do grupo por linha e os pontos do
+    ``eixo`` nas colunas. Grupos com menos de duas amostras (ou sem variação)
+    ficam com NaN.
+    """
+    from analise.estatisticas import codificar_grupos
+
+    codigos, niveis = codificar_grupos(df[coluna_grupo])
+    valores = df[coluna_valor].to_numpy(np.float64)
+    return densidades_de_codigos(codigos, valores, niveis, eixo, bw_method, nome=coluna_grupo)
+
+
+def densidades_de_codigos(codigos, valores, niveis, eixo, bw_method='scott', pesos=None, nome=None):
+    """Núcleo de ``densidades_por_grupo``: grupos já codificados (-1 = ausente) e pesos opcionais."""
+    valores = np.asarray(valores, dtype=np.float64)
+    pesos = np.ones(len(valores)) if pesos is None else np.asarray(pesos, dtype=np.float64)
+    validos = (codigos >= 0) & ~np.isnan(valores)
+    codigos, valores, pesos = codigos[validos], valores[validos], pesos[validos]
+    n_grupos = len(niveis)
+
+    contagem = np.bincount(codigos, weights=pesos, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = np.bincount(codigos, weights=pesos * valores, minlength=n_grupos) / contagem
+        desvios = valores - media[codigos]
+        variancia = np.bincount(codigos, weights=pesos * desvios * desvios, minlength=n_grupos) / (contagem - 1)
+        fatores = np.array([fator_banda(n, 1, bw_method) if n > 0 else np.nan for n in contagem])
+        bandas = np.sqrt(variancia) * fatores
+
+    eixo = np.asarray(eixo, dtype=np.float64)
+    resultado = np.full((n_grupos, len(eixo)), np.nan)
+    ativos = np.flatnonzero(np.isfinite(bandas) & (bandas > 0))
+    if len(ativos):
+        # A grade interna precisa ser fina para a menor banda e larga para a maior
+        origem, passo, tamanho, salto, _ = _eixo_interno(eixo, bandas[ativos].min())
+        margem = int(np.ceil(ALCANCE_KERNEL * bandas[ativos].max() / passo))
+        extra = margem - int(round((eixo[0] - origem) / passo))
+        origem -= extra * passo
+        tamanho += 2 * extra
+
+        mapa = np.full(n_grupos, -1)
+        mapa[ativos] = np.arange(len(ativos))
+        linha = mapa[codigos]
+        usar = linha >= 0
+        posicoes = np.vstack([linha[usar].astype(np.float64), valores[usar]])
+        grade = binning_linear(posicoes, [0.0, origem], [1.0, passo], [len(ativos) + 1, tamanho], pesos[usar])[:-1]
+
+        deslocamentos = np.arange(-margem, margem + 1) * passo
+        b = bandas[ativos][:, None]
+        kernels = np.exp(-0.5 * (deslocamentos[None, :] / b) ** 2) / (np.sqrt(2 * np.pi) * b)
+        from scipy.signal import fftconvolve
+
+        suavizada = fftconvolve(grade, kernels, mode='same', axes=1)
+
+        inicio = margem
+        pontos = suavizada[:, inicio:inicio + (len(eixo) - 1) * salto + 1:salto]
+        resultado[ativos] = np.clip(pontos, 0.0, None) / contagem[ativos][:, None]
+
+    return pd.DataFrame(resultado, index=pd.Index(niveis, name=nome), columns=eixo)
@@ -0,0 +1,78 @@
+"""Figuras enviadas ao navegador: montagem reaproveitada e resolução de cada sessão.
+
+Montar uma figura do Plotly (com a validação de cada atributo) custa mais
+que calcular os dados das seções já memorizadas, e se repetia a cada
+execução do script, em cada sessão. ``figura`` guarda as figuras montadas
+pelo conteúdo dos argumentos (hash dos arrays e tabelas): sessões que
+mostram os mesmos dados recebem o mesmo objeto, sem montar nem validar de
+novo. Como a mesma figura sempre gera o mesmo JSON, o Streamlit manda ao
+navegador só uma referência às mensagens grandes que ele já recebeu.
+
+O tamanho do JSON fica com ``analise.graficos``: as superfícies levam os
+eixos como vetores (não as grades repetidas do ``meshgrid``) e os valores em
+``float32``, que o Plotly codifica em binário (base64). ``pontos_por_curva``
+escolhe a resolução das curvas pela tela do navegador da sessão.
+"""
+
+import collections
+import hashlib
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Figuras montadas guardadas (as menos usadas saem primeiro)
+FIGURAS_EM_CACHE = 64
+
+# Pontos de cada curva de densidade, por tipo de tela
+PONTOS_POR_CURVA = {'larga': 500, 'estreita': 200}
+
+_figuras = collections.OrderedDict()  # hash do construtor e dos argumentos -> figura
+_lock = threading.Lock()
+
+
+def _resumir(valor, hasher):
+    """Acrescenta ao ``hasher`` o conteúdo de um argumento (arrays e tabelas pelos bytes)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        hasher.update(repr((type(valor).__name__, valor.shape, list(valor.axes))).encode())
+        hasher.update(pd.util.hash_pandas_object(valor, index=False).to_numpy().tobytes())
+    elif isinstance(valor, np.ndarray):
+        hasher.update(repr((valor.dtype.str, valor.shape)).encode())
+        hasher.update(np.ascontiguousarray(valor).tobytes())
+    elif isinstance(valor, (list, tuple)):
+        hasher.update(f'{type(valor).__name__}[{len(valor)}]'.encode())
+        for item in valor:
+            _resumir(item, hasher)
+    else:
+        hasher.update(repr(valor).encode())
+
+
+def chave_da_figura(construtor, *args, **kwargs):
+    hasher = hashlib.sha256(f'{construtor.__module__}.{construtor.__qualname__}'.encode())
+    _resumir(args, hasher)
+    _resumir(sorted(kwargs.items()), hasher)
+    return hasher.hexdigest()
+
+
+def figura(construtor, *args, **kwargs):
+    """``construtor(*args, **kwargs)``, reaproveitado quando os argumentos têm o mesmo conteúdo.
+
+    A figura devolvida é compartilhada entre sessões e não deve ser modificada.
+    """
+    chave = chave_da_figura(construtor, *args, **kwargs)
+    with _lock:
+        if chave in _figuras:
+            _figuras.move_to_end(chave)
+            return _figuras[chave]
+    resultado = construtor(*args, **kwargs)
+    with _lock:
+        _figuras[chave] = resultado
+        while len(_figuras) > FIGURAS_EM_CACHE:
+            _figuras.popitem(last=False)
+    return resultado
+
+
+def pontos_por_curva(cabecalhos):
+    """Resolução das curvas pela tela do navegador (telas estreitas de celulares recebem menos pontos)."""
+    agente = (cabecalhos or {}).get('User-Agent', '')
+    return PONTOS_POR_CURVA['estreita' if 'Mobi' in agente else 'larga']
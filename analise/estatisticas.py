@@ -0,0 +1,140 @@
+"""Estatísticas por grupo calculadas de forma vetorizada.
+
+Em vez de percorrer o DataFrame linha a linha, cada grupo vira um código
+inteiro e as somas são feitas com ``np.bincount`` sobre esses códigos.
+Quando os valores são inteiros de faixa pequena (notas, horas, ...), tudo
+sai de uma tabela de contagens grupo x valor, que também pode vir de
+agregados calculados por partes (ver ``analise.agregados``).
+"""
+
+import numpy as np
+import pandas as pd
+
+QUANTIS_PADRAO = (0.25, 0.5, 0.75)
+
+# Acima disso (grupos x valores distintos) os quantis são calculados ordenando os dados
+_LIMITE_CELULAS_HISTOGRAMA = 10_000_000
+
+
+def codificar_grupos(serie):
+    """Converte uma coluna em ``(codigos, niveis)``; valores ausentes recebem código -1."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy(), serie.cat.categories
+    if pd.api.types.is_bool_dtype(serie.dtype):
+        return serie.to_numpy().astype(np.int8), pd.Index([False, True])
+    if pd.api.types.is_integer_dtype(serie.dtype) and len(serie):
+        valores = serie.to_numpy()
+        minimo, maximo = int(valores.min()), int(valores.max())
+        if maximo - minimo < 1 << 16:
+            return (valores - minimo).astype(np.intp), pd.RangeIndex(minimo, maximo + 1)
+    codigos, niveis = pd.factorize(serie, sort=True)
+    return codigos, niveis
+
+
+def _quantis_de_contagens(contagens, valores, quantis):
+    """Quantis de cada linha de uma tabela ``grupos x valores`` (valores em ordem crescente)."""
+    n_grupos, n_valores = contagens.shape
+    acumulado = contagens.cumsum(axis=1)
+    contagem = acumulado[:, -1] if n_valores else np.zeros(n_grupos, dtype=np.int64)
+
+    # Cada linha recebe um deslocamento para que o vetor achatado fique monotônico
+    total = int(contagem.sum()) + 1
+    deslocamento = np.arange(n_grupos, dtype=np.int64)[:, None] * total
+    achatado = (acumulado + deslocamento).ravel()
+
+    def valor_na_posicao(k):
+        idx = np.searchsorted(achatado, k + deslocamento, side='right')
+        coluna = idx - np.arange(n_grupos)[:, None] * n_valores
+        return valores[np.clip(coluna, 0, n_valores - 1)]
+
+    return _interpolar(contagem, quantis, valor_na_posicao)
+
+
+def _quantis_por_ordenacao(codigos, valores, contagem, quantis):
+    ordem = np.lexsort((valores, codigos))
+    ordenados = valores[ordem]
+    inicio = np.concatenate(([0], np.cumsum(contagem)[:-1]))[:, None]
+
+    def valor_na_posicao(k):
+        return ordenados[np.clip(inicio + k, 0, len(ordenados) - 1)]
+
+    return _interpolar(contagem, quantis, valor_na_posicao)
+
+
+def _interpolar(contagem, quantis, valor_na_posicao):
+    # Interpolação linear, igual ao padrão de np.quantile / Series.quantile
+    posicao = np.asarray(quantis)[None, :] * (contagem[:, None] - 1)
+    baixo = np.floor(posicao).astype(np.int64)
+    alto = np.ceil(posicao).astype(np.int64)
+    v_baixo = valor_na_posicao(baixo).astype(np.float64)
+    v_alto = valor_na_posicao(alto).astype(np.float64)
+    resultado = v_baixo + (v_alto - v_baixo) * (posicao - baixo)
+    resultado[contagem == 0] = np.nan
+    return resultado
+
+
+def _montar_resultado(contagem, soma, media, variancia, tabela_quantis, quantis, niveis, nome, incluir_vazios):
+    resultado = pd.DataFrame(
+        {'contagem': contagem, 'soma': soma, 'media': media, 'variancia': variancia},
+        index=pd.Index(niveis, name=nome),
+    )
+    for i, q in enumerate(quantis):
+        resultado[f'q{q:g}'] = tabela_quantis[:, i]
+    if not incluir_vazios:
+        resultado = resultado[resultado['contagem'] > 0]
+    return resultado
+
+
+def estatisticas_de_contagens(contagens, valores, niveis, nome=None, quantis=QUANTIS_PADRAO, incluir_vazios=True):
+    """Mesmo resultado de ``estatisticas_por_grupo`` a partir de uma tabela de contagens.
+
+    ``contagens[g, v]`` é o número de linhas do grupo ``niveis[g]`` com valor
+    ``valores[v]`` (``valores`` em ordem crescente).
+    """
+    contagens = np.asarray(contagens, dtype=np.int64)
+    valores = np.asarray(valores, dtype=np.float64)
+    contagem = contagens.sum(axis=1)
+    soma = contagens @ valores
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / contagem
+        desvios = valores[None, :] - media[:, None]
+        variancia = (contagens * desvios * desvios).sum(axis=1) / (contagem - 1)
+    tabela_quantis = _quantis_de_contagens(contagens, valores, quantis) if len(quantis) else None
+    return _montar_resultado(contagem, soma, media, variancia, tabela_quantis, quantis, niveis, nome, incluir_vazios)
+
+
+def estatisticas_por_grupo(df, coluna_grupo, coluna_valor, quantis=QUANTIS_PADRAO, incluir_vazios=None):
+    """Contagem, soma, média, variância e quantis de ``coluna_valor`` para cada nível de ``coluna_grupo``.
+
+    Devolve um DataFrame indexado pelos níveis do grupo. Por padrão grupos sem
+    nenhuma linha só aparecem quando a coluna é categórica (para manter a
+    ordem e os níveis do esquema).
+    """
+    if incluir_vazios is None:
+        incluir_vazios = isinstance(df[coluna_grupo].dtype, pd.CategoricalDtype)
+    codigos, niveis = codificar_grupos(df[coluna_grupo])
+    valores = df[coluna_valor].to_numpy()
+    validos = (codigos >= 0) & ~pd.isna(valores)
+    if not validos.all():
+        codigos, valores = codigos[validos], valores[validos]
+    n_grupos = len(niveis)
+
+    if pd.api.types.is_integer_dtype(valores.dtype) and len(valores):
+        minimo = int(valores.min())
+        faixa = int(valores.max()) - minimo + 1
+        if n_grupos * faixa <= _LIMITE_CELULAS_HISTOGRAMA:
+            # Valores inteiros de faixa pequena: uma única tabela grupo x valor resolve tudo
+            celulas = codigos.astype(np.int64) * faixa + (valores - minimo)
+            contagens = np.bincount(celulas, minlength=n_grupos * faixa).reshape(n_grupos, faixa)
+            return estatisticas_de_contagens(contagens, np.arange(minimo, minimo + faixa), niveis,
+                                             coluna_grupo, quantis, incluir_vazios)
+
+    contagem = np.bincount(codigos, minlength=n_grupos)
+    soma = np.bincount(codigos, weights=valores, minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = soma / contagem
+        desvios = valores - media[codigos]
+        variancia = np.bincount(codigos, weights=desvios * desvios, minlength=n_grupos) / (contagem - 1)
+    tabela_quantis = _quantis_por_ordenacao(codigos, valores, contagem, quantis) if len(quantis) else None
+    return _montar_resultado(contagem, soma, media, variancia, tabela_quantis, quantis, niveis,
+                             coluna_grupo, incluir_vazios)
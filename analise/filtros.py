@@ -0,0 +1,219 @@
+"""Filtros por valores das colunas categóricas, resolvidos com índices de bitmap.
+
+Para cada valor de cada coluna categórica (e booleana) guardamos um bitset
+com um bit por linha, empacotado em palavras de 64 bits (1/8 de byte por
+linha). Um filtro como "Gender = Female e Family_Income em {Low, Medium}"
+vira um OU entre os bitsets dos valores de cada coluna e um E entre as
+colunas, operações sobre alguns MB mesmo com dezenas de milhões de linhas.
+
+As seções não recebem uma cópia filtrada do DataFrame: a ``Selecao``
+oferece a mesma interface dos ``Agregados`` e calcula, só quando alguma
+seção pede, as contagens sobre as linhas selecionadas. Contagens entre
+colunas categóricas saem direto dos bitsets (E seguido de contagem de bits);
+as que envolvem colunas numéricas leem apenas as duas colunas nas linhas
+selecionadas.
+"""
+
+import functools
+
+import numpy as np
+
+from analise.agregados import _DESLOCAMENTO_INTEIRO, Agregados, _codificar, _n_niveis
+from analise.cache import por_versao
+from analise.correlacao import MomentosCorrelacao
+from analise.cubo import ROTULOS_BOOLEANOS, CuboCategorico
+from analise.dados import COLUNAS_BOOLEANAS, COLUNAS_CATEGORICAS, COLUNAS_NUMERICAS, ESQUEMA
+
+COLUNAS_FILTRAVEIS = [c for c in ESQUEMA if c in COLUNAS_CATEGORICAS or c in COLUNAS_BOOLEANAS]
+
+# Rótulos de cada coluna filtrável, na ordem dos códigos
+ROTULOS_FILTRAVEIS = {c: list(ROTULOS_BOOLEANOS) if c in COLUNAS_BOOLEANAS
+                      else [str(v) for v in ESQUEMA[c].categories] for c in COLUNAS_FILTRAVEIS}
+
+# Abaixo disso as densidades das seções não têm variação suficiente
+MINIMO_ALUNOS = 10
+
+if hasattr(np, 'bitwise_count'):
+    def _contar_bits(palavras, axis=None):
+        return np.bitwise_count(palavras).sum(axis=axis, dtype=np.int64)
+else:  # NumPy < 2.0
+    _BITS_POR_BYTE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def _contar_bits(palavras, axis=None):
+        por_byte = _BITS_POR_BYTE[palavras.view(np.uint8)].reshape(*palavras.shape, 8)
+        return por_byte.sum(axis=-1, dtype=np.int64).sum(axis=axis)
+
+
+def _empacotar(mascara, palavras):
+    """Máscara booleana -> bitset com ``palavras`` palavras de 64 bits."""
+    bytes_ = np.zeros(palavras * 8, dtype=np.uint8)
+    empacotado = np.packbits(mascara)
+    bytes_[:len(empacotado)] = empacotado
+    return bytes_.view(np.uint64)
+
+
+def e(*bitsets):
+    """Linhas presentes em todos os bitsets."""
+    return functools.reduce(np.bitwise_and, bitsets)
+
+
+def ou(*bitsets):
+    """Linhas presentes em algum dos bitsets."""
+    return functools.reduce(np.bitwise_or, bitsets)
+
+
+class IndiceBitmap:
+    """Um bitset por valor de cada coluna filtrável do dataset."""
+
+    def __init__(self, df, colunas=None):
+        self.tamanho = len(df)
+        self.palavras = -(-len(df) // 64)
+        self.todos = _empacotar(np.ones(len(df), dtype=bool), self.palavras)
+        self.rotulos = {}
+        self.bits = {}  # coluna -> matriz (valores x palavras)
+        for coluna in COLUNAS_FILTRAVEIS if colunas is None else colunas:
+            codigos = _codificar(df[coluna])
+            self.rotulos[coluna] = ROTULOS_FILTRAVEIS[coluna]
+            self.bits[coluna] = np.vstack([_empacotar(codigos == k, self.palavras)
+                                           for k in range(len(self.rotulos[coluna]))])
+
+    def valor(self, coluna, rotulo):
+        """Linhas em que ``coluna`` vale ``rotulo`` (valores ausentes não entram em nenhum)."""
+        return self.bits[coluna][self.rotulos[coluna].index(rotulo)]
+
+    def algum(self, coluna, rotulos):
+        """Linhas em que ``coluna`` tem algum dos ``rotulos``."""
+        return ou(*(self.valor(coluna, r) for r in rotulos)) if rotulos else np.zeros_like(self.todos)
+
+    def nao(self, bitset):
+        return ~bitset & self.todos
+
+    def selecionar(self, filtros):
+        """Bitset de ``{coluna: [rotulos]}``: OU dentro de cada coluna, E entre as colunas."""
+        return e(self.todos, *(self.algum(c, rotulos) for c, rotulos in filtros.items()))
+
+    def contar(self, bitset):
+        return int(_contar_bits(bitset))
+
+    def linhas(self, bitset):
+        """Posições das linhas selecionadas, em ordem."""
+        return np.flatnonzero(np.unpackbits(bitset.view(np.uint8), count=self.tamanho))
+
+
+@por_versao
+def indice_do_dataset(df):
+    """Índice de bitmap do dataset carregado, construído uma vez por versão."""
+    return IndiceBitmap(df)
+
+
+class _Contagens(dict):
+    """Dicionário de contagens calculadas na primeira consulta (``calcular(chave)``)."""
+
+    def __init__(self, calcular, validas):
+        super().__init__()
+        self._calcular = calcular
+        self._validas = validas
+
+    def __contains__(self, chave):
+        return self._validas(chave)
+
+    def __missing__(self, chave):
+        if not self._validas(chave):
+            raise KeyError(chave)
+        valor = self[chave] = self._calcular(chave)
+        return valor
+
+
+class Selecao(Agregados):
+    """Linhas do DataFrame escolhidas por um bitset, consultadas como ``Agregados``.
+
+    Nada é calculado na criação; cada tabela de contagens pedida pelas seções
+    é calculada uma vez e guardada. A versão (``attrs['versao']``) combina a do
+    dataset com a descrição do filtro, então os resultados das seções ficam
+    memorizados por filtro.
+    """
+
+    def __init__(self, df, indice, bitset, descricao=''):
+        self.df = df
+        self.indice = indice
+        self.bitset = bitset
+        self.total = indice.contar(bitset)
+        self.columns = list(ESQUEMA)
+        self.pares = []
+        self.contagens = _Contagens(self._contar, lambda coluna: coluna in ESQUEMA)
+        self.conjuntas = _Contagens(lambda par: self._contar_conjunta(*par),
+                                    lambda par: len(par) == 2 and all(c in ESQUEMA for c in par))
+        self._codigos_lidos = {}
+        self.attrs = {}
+        if 'versao' in df.attrs:
+            self.attrs['versao'] = f"{df.attrs['versao']}|{descricao}"
+
+    @classmethod
+    def filtrar(cls, df, filtros):
+        """Seleção das linhas de ``df`` que passam em ``{coluna: [rotulos]}``."""
+        indice = indice_do_dataset(df)
+        filtros = {c: sorted(r) for c, r in sorted(filtros.items())}
+        descricao = ';'.join(f"{c}={','.join(r)}" for c, r in filtros.items())
+        return cls(df, indice, indice.selecionar(filtros), descricao)
+
+    @functools.cached_property
+    def linhas(self):
+        return self.indice.linhas(self.bitset)
+
+    def _codigos(self, coluna):
+        if coluna not in self._codigos_lidos:
+            self._codigos_lidos[coluna] = _codificar(self.df[coluna].iloc[self.linhas])
+        return self._codigos_lidos[coluna]
+
+    def _contar(self, coluna):
+        if coluna in self.indice.bits:
+            return _contar_bits(self.indice.bits[coluna] & self.bitset, axis=1)
+        codigos = self._codigos(coluna)
+        return np.bincount(codigos[codigos >= 0], minlength=_n_niveis(coluna))
+
+    def _contar_conjunta(self, a, b):
+        if a in self.indice.bits and b in self.indice.bits:
+            # Contagem de bits de (valor de a) E (valor de b) E (seleção), para cada par de valores
+            bits_a = self.indice.bits[a] & self.bitset
+            return _contar_bits(bits_a[:, None, :] & self.indice.bits[b][None, :, :], axis=2)
+        codigos_a, codigos_b = self._codigos(a), self._codigos(b)
+        validos = (codigos_a >= 0) & (codigos_b >= 0)
+        n_b = _n_niveis(b)
+        celulas = codigos_a[validos] * n_b + codigos_b[validos]
+        return np.bincount(celulas, minlength=_n_niveis(a) * n_b).reshape(_n_niveis(a), n_b)
+
+    def conjunta(self, a, b):
+        return self.conjuntas[(a, b)]
+
+    @functools.cached_property
+    def momentos(self):
+        # Uma coluna por vez, só nas posições selecionadas (os mesmos códigos das contagens),
+        # sem copiar as linhas do DataFrame
+        matriz = np.empty((len(self.linhas), len(ESQUEMA)), dtype=np.float32, order='F')
+        centros = np.zeros(len(ESQUEMA))
+        for j, coluna in enumerate(ESQUEMA):
+            valores = self._codigos(coluna).astype(np.float64)
+            if coluna in COLUNAS_NUMERICAS:
+                valores -= _DESLOCAMENTO_INTEIRO
+            else:
+                valores[valores < 0] = np.nan
+            if not np.isnan(valores).all():
+                centros[j] = np.nanmean(valores)
+            matriz[:, j] = valores - centros[j]
+        return MomentosCorrelacao.de_matriz(matriz, centros)
+
+    def cubo(self):
+        discretas = list(self.indice.bits)
+        contagens = _Contagens(
+            lambda par: np.diag(self.contagens[par[0]]) if par[0] == par[1] else self.conjunta(*par),
+            lambda par: len(par) == 2 and all(c in self.indice.bits for c in par),
+        )
+        return CuboCategorico({c: self.indice.rotulos[c] for c in discretas}, contagens, self.total)
+
+
+def filtrar(df, filtros):
+    """``df`` restrito a ``{coluna: [rotulos]}``; sem filtros devolve o próprio ``df``."""
+    filtros = {c: r for c, r in filtros.items() if r}
+    if not filtros:
+        return df
+    return Selecao.filtrar(df, filtros)
@@ -0,0 +1,163 @@
+"""Figuras do dashboard, montadas a partir dos resultados de ``analise.secoes``.
+
+As mesmas funções servem à página do Streamlit e à exportação do relatório
+(``exportar_relatorio.py``), de modo que os dois mostram gráficos idênticos.
+Todas as figuras são do Plotly, desenhadas pelo navegador (nada é
+rasterizado no servidor). Para manter o JSON enviado pequeno, as superfícies
+recebem os eixos como vetores, em vez das grades do ``meshgrid``, e os
+valores vão em ``float32``, que o Plotly codifica em binário.
+
+O Plotly é importado dentro de cada função: abrir o dashboard não paga a
+importação da biblioteca de gráficos se a página aberta não a usa.
+"""
+
+import numpy as np
+
+
+def barras(tabela, titulo=None):
+    """Barras de cada coluna da tabela (equivalente ao ``st.bar_chart`` fora do Streamlit)."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure([go.Bar(x=[str(i) for i in tabela.index], y=tabela[coluna], name=str(coluna))
+                     for coluna in tabela.columns])
+    fig.update_layout(title=titulo, xaxis_title=tabela.index.name, barmode='stack',
+                      showlegend=len(tabela.columns) > 1)
+    return fig
+
+
+def _compacto(valores):
+    """Valores de um gráfico em ``float32`` (precisão de sobra para a tela, metade dos bytes)."""
+    return np.asarray(valores, dtype=np.float32)
+
+
+def histograma_notas(contagens, bordas):
+    """Histograma da seção 4: uma barra por intervalo, da borda esquerda à direita."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(x=_compacto((bordas[:-1] + bordas[1:]) / 2), y=contagens,
+                           width=_compacto(np.diff(bordas)), marker_color='blue', opacity=0.7))
+    fig.update_layout(title='Distribuição de Frequência de Notas', xaxis_title='Nota', yaxis_title='Frequência',
+                      bargap=0)
+    return fig
+
+
+def superficie_estudo_notas(eixo_x, eixo_y, z_grid):
+    """Seção 5.1: densidade conjunta de notas e horas estudadas."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[
+        go.Surface(
+            z=_compacto(z_grid),
+            x=_compacto(eixo_x),
+            y=_compacto(eixo_y),
+            colorscale="Viridis",
+            showscale=True,
+            opacity=0.9
+        )
+    ])
+    fig.update_layout(
+        title="Distribuição 3D da frequência de horas estudadas e notas no exame",
+        scene=dict(
+            xaxis_title="Nota no exame",
+            yaxis_title="Horas estudadas",
+            zaxis_title="Densidade",
+            zaxis=dict(visible=False)  # Ocultar o eixo Z
+        ),
+    )
+    return fig
+
+
+def superficie_sono_estudo(eixo_x, eixo_y, z_grid):
+    """Seção 5.2: densidade conjunta de horas de sono e horas estudadas."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Surface(z=_compacto(z_grid), x=_compacto(eixo_x), y=_compacto(eixo_y),
+                                     colorscale='Viridis')])
+    fig.update_layout(
+        title='Distribuição 3D da frequência de horas estudadas e horas de sono',
+        scene=dict(
+            xaxis_title='Horas de sono médio por noite',
+            yaxis_title='Horas estudadas',
+            zaxis_title='Densidade',
+        ),
+        margin=dict(l=0, r=0, b=0, t=40),
+        # Habilitar zoom interativo
+        scene_camera=dict(
+            eye=dict(x=1.25, y=1.25, z=0.75)
+        )
+    )
+    return fig
+
+
+def densidades_por_sono(eixo_notas, densidades, horas_sono, titulo, faixa_x, faixa_y, template=None):
+    """Seção 5.3: uma curva de densidade das notas para cada quantidade de horas de sono."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    # Numa seleção pequena pode não haver alunos com alguma das quantidades de sono
+    for horas in (h for h in horas_sono if h in densidades.index):
+        fig.add_trace(go.Scatter(
+            x=_compacto(eixo_notas), y=_compacto(densidades.loc[horas]), mode='lines', name=f'Sleep = {horas} hours', line=dict(width=3)
+        ))
+    fig.update_layout(
+        title=titulo,
+        xaxis_title='Nota no Exame',
+        yaxis_title='Densidade',
+        hovermode='closest',
+        xaxis=dict(range=list(faixa_x)),
+        yaxis=dict(range=list(faixa_y)),
+    )
+    if template is not None:
+        fig.update_layout(template=template)
+    return fig
+
+
+def mapa_correlacao(matriz):
+    """Seção 6: matriz correlacional com fundo escuro."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=go.Heatmap(
+        z=_compacto(matriz.to_numpy()),
+        x=matriz.columns,
+        y=matriz.index,
+        colorscale='RdBu_r',
+        zmin=-0.1, zmax=1,  # Ajustando os limites para -0.1 até 1
+        texttemplate='%{z:.2f}',
+        textfont=dict(size=8),  # Reduzir o tamanho da fonte
+        xgap=1, ygap=1,  # Espaçamento entre as células
+        colorbar=dict(title='Correlacao'),
+    ))
+    fig.update_layout(
+        title='Matriz Correlacional',
+        xaxis_title='Variáveis',
+        yaxis_title='Variáveis',
+        yaxis=dict(autorange='reversed'),
+        template='plotly_dark',
+        width=900, height=800,
+    )
+    return fig
+
+
+def superficie_presenca_notas(eixo_x, eixo_y, z_grid):
+    """Seção 7: densidade conjunta de notas e presença nas aulas."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(data=[go.Surface(
+        z=_compacto(z_grid),
+        x=_compacto(eixo_x),
+        y=_compacto(eixo_y),
+        colorscale='Viridis',
+        colorbar=dict(title='Densidade'),
+    )])
+    fig.update_layout(
+        title='Distribuição 3D da Frequência de Presença e Notas no Exame',
+        scene=dict(
+            xaxis_title='Nota no Exame',
+            yaxis_title='Presença nas Aulas',
+            zaxis_title='Densidade',
+            camera_eye=dict(x=2, y=2, z=2),  # Posição inicial da câmera para visualização
+        ),
+        margin=dict(l=0, r=0, b=0, t=50),
+        width=800, height=600
+    )
+    return fig
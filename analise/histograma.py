@@ -0,0 +1,94 @@
+"""Histogramas de colunas inteiras a partir de contagens por valor e somas acumuladas.
+
+As colunas numéricas do dataset são inteiras e de faixa pequena, então a
+contagem de linhas para cada valor é o histograma mais fino possível. Com
+as somas acumuladas dessas contagens, o número de linhas num intervalo
+qualquer é a diferença de duas posições: um histograma com qualquer faixa e
+qualquer largura de intervalo custa ``O(intervalos)``, sem voltar às
+linhas, e dá exatamente o resultado de ``np.histogram``.
+
+As contagens de cada coluna são calculadas uma vez por versão do dataset
+(``histograma_da_coluna``) e servem a todas as seções que mostram
+distribuições. Os ``Agregados`` (e a ``Selecao`` e o ``Banco``) já guardam
+essas contagens; histogramas de pedaços ou partes diferentes do dataset se
+juntam com ``combinar``.
+"""
+
+import numpy as np
+
+from analise.cache import por_versao
+
+
+class HistogramaAcumulado:
+    """Contagens de uma coluna inteira por valor (``contagens[k]``: linhas com valor ``inicio + k``)."""
+
+    def __init__(self, contagens, inicio):
+        self.contagens = np.asarray(contagens, dtype=np.int64)
+        self.inicio = int(inicio)
+        # acumuladas[k]: linhas com valor menor que inicio + k
+        self.acumuladas = np.concatenate([[0], np.cumsum(self.contagens)])
+
+    @classmethod
+    def de_valores(cls, valores):
+        valores = np.asarray(valores)
+        if not len(valores):
+            return cls([], 0)
+        inicio = int(valores.min())
+        return cls(np.bincount((valores - inicio).astype(np.intp)), inicio)
+
+    def combinar(self, outro):
+        """Histograma das linhas dos dois (pedaços ou partes diferentes do dataset)."""
+        if not len(outro.contagens):
+            return self
+        if not len(self.contagens):
+            return outro
+        inicio = min(self.inicio, outro.inicio)
+        fim = max(self.inicio + len(self.contagens), outro.inicio + len(outro.contagens))
+        contagens = np.zeros(fim - inicio, dtype=np.int64)
+        for parte in (self, outro):
+            contagens[parte.inicio - inicio:parte.inicio - inicio + len(parte.contagens)] += parte.contagens
+        return HistogramaAcumulado(contagens, inicio)
+
+    @property
+    def total(self):
+        return int(self.acumuladas[-1])
+
+    def _presentes(self):
+        return np.flatnonzero(self.contagens) + self.inicio
+
+    def minimo(self):
+        return self._presentes().min()
+
+    def maximo(self):
+        return self._presentes().max()
+
+    def _menores_que(self, limites):
+        posicoes = np.ceil(limites).astype(np.int64) - self.inicio
+        return self.acumuladas[np.clip(posicoes, 0, len(self.contagens))]
+
+    def _ate(self, limite):
+        posicao = int(np.floor(limite)) + 1 - self.inicio
+        return self.acumuladas[min(max(posicao, 0), len(self.contagens))]
+
+    def histograma(self, bins=10, range=None):
+        """Mesmo resultado de ``np.histogram(valores, bins, range)``.
+
+        Cada intervalo é ``[borda, próxima borda)``, o último fechado dos dois
+        lados; como os valores são inteiros, as linhas abaixo de uma borda
+        são as acumuladas até o primeiro inteiro que não é menor que ela.
+        """
+        presentes = self._presentes()
+        extremos = [presentes.min(), presentes.max()] if len(presentes) else []
+        bordas = np.histogram_bin_edges(np.asarray(extremos, dtype=np.float64), bins=bins, range=range)
+        abaixo = np.append(self._menores_que(bordas[:-1]), self._ate(bordas[-1]))
+        return np.diff(abaixo), bordas
+
+
+@por_versao
+def histograma_da_coluna(df, coluna):
+    """``HistogramaAcumulado`` de uma coluna numérica, calculado uma vez por versão do dataset.
+
+    Cada coluna é memorizada à parte: as tarefas do pré-cálculo recebem só as
+    colunas que leem.
+    """
+    return HistogramaAcumulado.de_valores(df[coluna].to_numpy())
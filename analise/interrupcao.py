@@ -0,0 +1,33 @@
+"""Interrupção cooperativa dos cálculos longos feitos em segundo plano.
+
+``analise.progressivo`` roda cada cálculo com um sinal (``threading.Event``)
+guardado num ``ContextVar``. Os laços por pedaços dos cálculos longos (o
+binning das densidades, as reamostragens do bootstrap) chamam ``verificar``
+entre um pedaço e outro e param com ``Cancelado`` quando o sinal foi dado,
+liberando a thread. Fora do segundo plano não há sinal e ``verificar`` não
+faz nada.
+"""
+
+import contextvars
+
+_sinal = contextvars.ContextVar('sinal_de_interrupcao', default=None)
+
+
+class Cancelado(Exception):
+    """O cálculo foi interrompido porque ninguém espera mais o resultado."""
+
+
+def verificar():
+    """Levanta ``Cancelado`` se o cálculo em andamento nesta thread foi cancelado."""
+    sinal = _sinal.get()
+    if sinal is not None and sinal.is_set():
+        raise Cancelado()
+
+
+def executar_com_sinal(sinal, funcao, *args, **kwargs):
+    """``funcao(*args, **kwargs)``, interrompida nos pontos de ``verificar`` quando ``sinal`` for dado."""
+    token = _sinal.set(sinal)
+    try:
+        return funcao(*args, **kwargs)
+    finally:
+        _sinal.reset(token)
@@ -0,0 +1,72 @@
+"""Memória ocupada pelo dataset e orçamento de memória do dashboard.
+
+``relatorio_memoria`` compara, coluna a coluna, a representação compacta
+(``analise.dados.compactar``) com a de um ``pd.read_csv`` sem esquema (textos
+e ``int64``), medida numa amostra do próprio CSV e projetada para todas as
+linhas. ``estimar_memoria`` prevê, sem ler o arquivo inteiro, quanto o
+DataFrame compacto vai ocupar: o dashboard usa essa previsão para respeitar
+o orçamento (``--memoria-maxima``) e passar ao modo por partes quando o
+dataset não cabe.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analise.cache import por_versao
+from analise.dados import ESQUEMA
+
+# Linhas lidas para medir a representação sem esquema e o tamanho médio das linhas
+LINHAS_AMOSTRA = 10_000
+BYTES_AMOSTRA = 1 << 16
+
+
+def _largura(tipo):
+    """Bytes por valor de uma coluna do esquema na representação compacta."""
+    if isinstance(tipo, pd.CategoricalDtype):
+        return 1 if len(tipo.categories) < 128 else 2
+    return np.dtype(tipo).itemsize
+
+
+BYTES_POR_LINHA = sum(_largura(t) for t in ESQUEMA.values())
+
+
+def memoria_por_coluna(df):
+    """Bytes ocupados por cada coluna (incluindo as categorias)."""
+    return df.memory_usage(deep=True, index=False)
+
+
+@por_versao
+def memoria_sem_compactar(df):
+    """Bytes que cada coluna ocuparia lida sem esquema, projetados a partir de uma amostra do CSV."""
+    amostra = pd.read_csv(df.attrs['caminho'], nrows=LINHAS_AMOSTRA)
+    por_linha = amostra.memory_usage(deep=True, index=False) / max(len(amostra), 1)
+    return (por_linha * len(df)).round().astype(np.int64)
+
+
+def relatorio_memoria(df):
+    """Tabela por coluna: tipo, KB compacto, KB sem esquema e fator de redução (com o total)."""
+    compacto = memoria_por_coluna(df)
+    tabela = pd.DataFrame({'Tipo': df.dtypes.astype(str), 'Compacto (KB)': compacto / 2**10})
+    if 'caminho' in df.attrs:
+        tabela['Sem esquema (KB)'] = memoria_sem_compactar(df).reindex(tabela.index) / 2**10
+        tabela['Redução'] = tabela['Sem esquema (KB)'] / tabela['Compacto (KB)']
+    total = tabela.drop(columns='Tipo').sum()
+    if 'Redução' in tabela:
+        total['Redução'] = total['Sem esquema (KB)'] / total['Compacto (KB)']
+    tabela.loc['Total'] = total
+    tabela.loc['Total', 'Tipo'] = ''
+    return tabela.round(1)
+
+
+def estimar_memoria(caminho):
+    """Bytes previstos para o DataFrame compacto do CSV, pelo tamanho médio das primeiras linhas."""
+    tamanho = os.path.getsize(caminho)
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline()
+        linhas = f.read(BYTES_AMOSTRA).split(b'\n')[:-1]  # a última pode estar incompleta
+    if not linhas:
+        return 0
+    bytes_por_linha_csv = sum(len(linha) + 1 for linha in linhas) / len(linhas)
+    return int((tamanho - len(cabecalho)) / bytes_por_linha_csv * BYTES_POR_LINHA)
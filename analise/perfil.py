@@ -0,0 +1,215 @@
+"""Instrumentação do dashboard: tempo, CPU, memória e bytes enviados ao navegador.
+
+Um ``Registro`` guarda os trechos medidos de uma execução do script. Cada
+trecho (uma seção inteira ou um cálculo dentro dela) anota o tempo de
+parede, o tempo de CPU da thread, o pico de memória alocada pelo Python
+(``tracemalloc``) e, para as seções, o tamanho das mensagens que o
+Streamlit enviou ao navegador. Enquanto nenhum registro está ativo,
+``trecho`` não faz nada, então a instrumentação pode ficar no código.
+
+Os trechos podem ser exportados em JSON lines ou no formato de trace do
+Chrome (abrir em ``chrome://tracing`` ou https://ui.perfetto.dev).
+
+O ``tracemalloc`` é global ao processo e deixa as alocações mais lentas:
+ele só fica ligado enquanto há algum registro ativo, e com várias sessões
+medindo ao mesmo tempo os picos de uma incluem as alocações das outras.
+"""
+
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+_registro_atual = contextvars.ContextVar('registro_perfil', default=None)
+
+_lock = threading.Lock()
+_registros_com_memoria = 0
+
+
+class _Aberto:
+    """Trecho em andamento: guarda o maior pico de memória visto enquanto ele está aberto."""
+
+    def __init__(self, memoria_inicial):
+        self.memoria_inicial = memoria_inicial
+        self.pico = memoria_inicial
+        self.bytes_enviados = 0
+        self.mensagens = 0
+
+
+class Registro:
+    """Trechos medidos durante uma execução do script."""
+
+    def __init__(self, memoria=True, eventos=None):
+        self.memoria = memoria
+        self.eventos = list(eventos or [])
+        self._abertos = []
+
+    def trecho(self, nome, categoria='calculo'):
+        return _medir(self, nome, categoria)
+
+    def somar_envio(self, tamanho):
+        """Conta ``tamanho`` bytes enviados ao navegador em todos os trechos abertos."""
+        for aberto in self._abertos:
+            aberto.bytes_enviados += tamanho
+            aberto.mensagens += 1
+
+    def tabela(self):
+        """Trechos em ordem de início, com tempos em ms e memória em MB."""
+        if not self.eventos:
+            return pd.DataFrame()
+        tabela = pd.DataFrame(self.eventos).sort_values('inicio', kind='stable')
+        return pd.DataFrame({
+            'Trecho': ['  ' * n + nome for n, nome in zip(tabela['nivel'], tabela['nome'])],
+            'Parede (ms)': tabela['parede_s'] * 1e3,
+            'CPU (ms)': tabela['cpu_s'] * 1e3,
+            'Pico (MB)': pd.to_numeric(tabela['pico_bytes']) / 2**20,
+            'Enviado (KB)': tabela['bytes_enviados'] / 2**10,
+        }).set_index('Trecho').round(2)
+
+    def para_jsonl(self):
+        return ''.join(json.dumps(evento, ensure_ascii=False) + '\n' for evento in self.eventos)
+
+    def para_chrome_trace(self):
+        """Eventos completos (``"ph": "X"``) no formato de trace do Chrome."""
+        eventos = [{
+            'name': evento['nome'], 'cat': evento['categoria'], 'ph': 'X',
+            'ts': evento['inicio'] * 1e6, 'dur': evento['parede_s'] * 1e6,
+            'pid': evento['pid'], 'tid': evento['tid'],
+            'args': {chave: evento[chave] for chave in ('cpu_s', 'pico_bytes', 'bytes_enviados', 'mensagens')},
+        } for evento in self.eventos]
+        return json.dumps({'traceEvents': eventos, 'displayTimeUnit': 'ms'})
+
+
+@contextlib.contextmanager
+def _medir(registro, nome, categoria):
+    memoria = registro.memoria and tracemalloc.is_tracing()
+    if memoria:
+        atual, pico = tracemalloc.get_traced_memory()
+        # O pico é zerado a cada trecho; o trecho de fora guarda o que já tinha visto
+        for aberto in registro._abertos:
+            aberto.pico = max(aberto.pico, pico)
+        tracemalloc.reset_peak()
+    aberto = _Aberto(atual if memoria else 0)
+    nivel = len(registro._abertos)
+    registro._abertos.append(aberto)
+    epoca, inicio, cpu = time.time(), time.perf_counter(), time.thread_time()
+    try:
+        yield aberto
+    finally:
+        parede, cpu = time.perf_counter() - inicio, time.thread_time() - cpu
+        registro._abertos.pop()
+        pico = None
+        if memoria:
+            aberto.pico = max(aberto.pico, tracemalloc.get_traced_memory()[1])
+            pico = aberto.pico - aberto.memoria_inicial
+            for externo in registro._abertos:
+                externo.pico = max(externo.pico, aberto.pico)
+        registro.eventos.append({
+            'nome': nome, 'categoria': categoria, 'nivel': nivel, 'epoca': epoca, 'inicio': inicio,
+            'parede_s': parede, 'cpu_s': cpu, 'pico_bytes': pico,
+            'bytes_enviados': aberto.bytes_enviados, 'mensagens': aberto.mensagens,
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+        })
+
+
+@contextlib.contextmanager
+def ativar(registro):
+    """Torna ``registro`` o destino dos trechos medidos neste contexto (thread da sessão)."""
+    global _registros_com_memoria
+    if registro.memoria:
+        with _lock:
+            if _registros_com_memoria == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            _registros_com_memoria += 1
+    token = _registro_atual.set(registro)
+    try:
+        yield registro
+    finally:
+        _registro_atual.reset(token)
+        if registro.memoria:
+            with _lock:
+                _registros_com_memoria -= 1
+                if _registros_com_memoria == 0:
+                    tracemalloc.stop()
+
+
+def trecho(nome, categoria='calculo'):
+    """Mede o bloco no registro ativo; sem registro ativo não faz nada."""
+    registro = _registro_atual.get()
+    if registro is None:
+        return contextlib.nullcontext()
+    return registro.trecho(nome, categoria)
+
+
+def medido(funcao):
+    """Decorador: cada chamada de ``funcao`` vira um trecho com o nome dela."""
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        with trecho(funcao.__name__):
+            return funcao(*args, **kwargs)
+    return envoltorio
+
+
+# Integração com o Streamlit: conta os bytes de cada mensagem enviada ao navegador
+
+def _somar_envio(tamanho):
+    registro = _registro_atual.get()
+    if registro is not None:
+        registro.somar_envio(tamanho)
+
+
+_arquivos_instrumentados = False
+
+
+def _instrumentar_arquivos():
+    """Conta também imagens e arquivos (``st.pyplot``, ...), que vão por HTTP e não nas mensagens."""
+    global _arquivos_instrumentados
+    from streamlit import runtime
+
+    with _lock:
+        if _arquivos_instrumentados or not runtime.exists():
+            return
+        gerenciador = runtime.get_instance().media_file_mgr
+        adicionar = gerenciador.add
+
+        @functools.wraps(adicionar)
+        def envoltorio(path_or_data, *args, **kwargs):
+            if isinstance(path_or_data, bytes):
+                _somar_envio(len(path_or_data))
+            return adicionar(path_or_data, *args, **kwargs)
+
+        gerenciador.add = envoltorio
+        _arquivos_instrumentados = True
+
+
+@contextlib.contextmanager
+def medir_envio():
+    """Soma ao registro ativo o tamanho das mensagens que a sessão enviar dentro do bloco.
+
+    Usa detalhes internos do Streamlit (a fila de mensagens do
+    ``ScriptRunContext``); se eles não existirem, o bloco roda sem medir.
+    """
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    contexto = get_script_run_ctx()
+    if contexto is None or _registro_atual.get() is None or not hasattr(contexto, '_enqueue'):
+        yield
+        return
+    _instrumentar_arquivos()
+    enfileirar = contexto._enqueue
+
+    def envoltorio(mensagem):
+        _somar_envio(mensagem.ByteSize())
+        enfileirar(mensagem)
+
+    contexto._enqueue = envoltorio
+    try:
+        yield
+    finally:
+        contexto._enqueue = enfileirar
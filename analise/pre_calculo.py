@@ -0,0 +1,197 @@
+"""Pré-cálculo das seções em paralelo, num pool de processos.
+
+Os cálculos das seções não dependem uns dos outros. Cada um é declarado
+como uma ``Tarefa`` com as colunas que lê; ``pre_calcular`` copia essas
+colunas uma única vez para um bloco de memória compartilhada (códigos
+``int8``/``bool``, sem passar o DataFrame por pickle), distribui as tarefas
+entre os processos e guarda cada resultado na memorização por versão das
+seções (``analise.cache.por_versao``). Depois disso, abrir qualquer página
+só monta os gráficos.
+
+O pool não é criado pelo processo que chama ``pre_calcular``, e sim por um
+interpretador novo (``_lancador``), que recebe as tarefas e devolve os
+resultados por pipes. Os processos do pool importam de novo o módulo
+principal de quem os cria; no Streamlit esse módulo é o próprio script do
+dashboard, que voltaria a carregar o dataset e a chamar ``pre_calcular``.
+O módulo principal do lançador é só um ``python -c`` sem arquivo. O dashboard usa ``pre_calcular_em_segundo_plano``:
+a página aberta é calculada e desenhada sem esperar o pool.
+
+As tarefas mais caras (matriz correlacional, superfícies) vêm primeiro, de
+modo que o tempo total tende ao da tarefa mais longa quando há processos
+suficientes.
+"""
+
+import collections
+import inspect
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+
+from analise import secoes
+from analise.cubo import cubo_do_dataset
+from analise.dados import COLUNAS_CATEGORICAS, ESQUEMA
+
+Tarefa = collections.namedtuple('Tarefa', 'nome funcao argumentos colunas')
+
+# Argumentos iguais aos usados pelas páginas, para que a memorização os encontre
+TAREFAS = [
+    Tarefa('correlacao', secoes.correlacao, (), list(ESQUEMA)),
+    *[Tarefa(f'superficie {secao}', secoes.superficie, argumentos, list(argumentos[:2]))
+      for secao, argumentos in secoes.SUPERFICIES.items()],
+    Tarefa('densidades_notas_por_sono', secoes.densidades_notas_por_sono, (), ['Sleep_Hours', 'Exam_Score']),
+    Tarefa('densidades_notas_por_sono 80-100', secoes.densidades_notas_por_sono, (80, 100),
+           ['Sleep_Hours', 'Exam_Score']),
+    Tarefa('recursos_por_escola', secoes.recursos_por_escola, (), ['School_Type', 'Access_to_Resources']),
+    Tarefa('recursos_por_dificuldade', secoes.recursos_por_dificuldade, (),
+           ['Learning_Disabilities', 'Access_to_Resources']),
+    Tarefa('medias_por_escola', secoes.medias_por_escola, (), ['School_Type', 'Exam_Score']),
+    Tarefa('medias_por_internet', secoes.medias_por_internet, (), ['Internet_Access', 'Exam_Score']),
+    Tarefa('diferenca_por_escola', secoes.diferenca_por_escola, (), ['School_Type', 'Exam_Score']),
+    Tarefa('diferenca_por_internet', secoes.diferenca_por_internet, (), ['Internet_Access', 'Exam_Score']),
+    Tarefa('reforco', secoes.reforco, (), ['Tutoring_Sessions', 'Exam_Score']),
+    Tarefa('frequencia_notas', secoes.frequencia_notas, (), ['Exam_Score']),
+    Tarefa('distribuicao_notas', secoes.distribuicao_notas, (), ['Exam_Score']),
+]
+
+_lock = threading.Lock()
+
+# Versões do dataset cujo pré-cálculo em segundo plano já foi disparado neste processo
+_versoes_iniciadas = set()
+_lock_versoes = threading.Lock()
+
+# Estado de cada processo do pool: colunas lidas da memória compartilhada
+_memoria = None
+_colunas = {}
+
+
+def _contexto():
+    # O lançador já tem threads (as do NumPy, por exemplo); "fork" copiaria locks no meio do uso
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in metodos else 'spawn')
+
+
+def _compartilhar(df, colunas):
+    """Copia as colunas para um bloco de memória compartilhada; devolve ``(bloco, layout)``."""
+    arrays = {}
+    for coluna in colunas:
+        serie = df[coluna]
+        arrays[coluna] = serie.cat.codes.to_numpy() if coluna in COLUNAS_CATEGORICAS else serie.to_numpy()
+    tamanho = sum(a.nbytes for a in arrays.values())
+    bloco = shared_memory.SharedMemory(create=True, size=max(tamanho, 1))
+    layout, inicio = [], 0
+    for coluna, array in arrays.items():
+        np.ndarray(array.shape, array.dtype, buffer=bloco.buf, offset=inicio)[:] = array
+        layout.append((coluna, array.dtype.str, len(array), inicio))
+        inicio += array.nbytes
+    return bloco, layout
+
+
+def _anexar(nome, layout):
+    """Inicialização de cada processo do pool: abre o bloco e monta as colunas sobre ele."""
+    global _memoria
+    _memoria = shared_memory.SharedMemory(name=nome)
+    # Quem remove o bloco no final é o processo que o criou, não o resource_tracker do lançador
+    resource_tracker.unregister(_memoria._name, 'shared_memory')
+    for coluna, tipo, tamanho, inicio in layout:
+        _colunas[coluna] = np.ndarray(tamanho, np.dtype(tipo), buffer=_memoria.buf, offset=inicio)
+
+
+def _executar(tarefa):
+    """Roda a tarefa sobre as colunas compartilhadas, sem memorização."""
+    df = pd.DataFrame({
+        coluna: (pd.Categorical.from_codes(_colunas[coluna], dtype=ESQUEMA[coluna])
+                 if coluna in COLUNAS_CATEGORICAS else _colunas[coluna])
+        for coluna in tarefa.colunas
+    }, copy=False)
+    return inspect.unwrap(tarefa.funcao)(df, *tarefa.argumentos)
+
+
+def _lancar(nome, layout, tarefas, processos):
+    """Cria o pool num interpretador novo; gera ``(índice da tarefa, resultado)`` conforme as tarefas terminam."""
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [raiz, os.environ.get('PYTHONPATH')])))
+    comando = [sys.executable, '-c', 'from analise.pre_calculo import _lancador; _lancador()']
+    with subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=ambiente) as lancador:
+        pickle.dump((nome, layout, tarefas, processos), lancador.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+        lancador.stdin.close()
+        while True:
+            try:
+                yield pickle.load(lancador.stdout)
+            except EOFError:
+                break
+    if lancador.returncode:
+        raise RuntimeError(f'o pré-cálculo terminou com código {lancador.returncode}')
+
+
+def _lancador():
+    """Processo intermediário: roda as tarefas recebidas na entrada padrão e escreve os resultados na saída."""
+    entrada, saida = sys.stdin.buffer, sys.stdout.buffer
+    sys.stdout = sys.stderr  # a saída padrão leva só os resultados
+    nome, layout, tarefas, processos = pickle.load(entrada)
+    with ProcessPoolExecutor(min(processos, len(tarefas)), mp_context=_contexto(),
+                             initializer=_anexar, initargs=(nome, layout)) as executor:
+        futuros = {executor.submit(_executar, t): i for i, t in enumerate(tarefas)}
+        for futuro in as_completed(futuros):
+            pickle.dump((futuros[futuro], futuro.result()), saida, protocol=pickle.HIGHEST_PROTOCOL)
+            saida.flush()
+
+
+def pre_calcular(df, processos=None, tarefas=TAREFAS):
+    """Calcula em paralelo as tarefas ainda não memorizadas para a versão de ``df``.
+
+    Devolve os nomes das tarefas calculadas. Com um único processo não faz
+    nada: as seções continuam sendo calculadas quando abertas.
+    """
+    processos = processos or os.cpu_count() or 1
+    if processos <= 1 or 'versao' not in df.attrs:
+        return []
+    with _lock:
+        pendentes = [t for t in tarefas if not t.funcao.memorizado(df, *t.argumentos)]
+        if not pendentes:
+            return []
+        colunas = list(dict.fromkeys(c for t in pendentes for c in t.colunas))
+        bloco, layout = _compartilhar(df, colunas)
+        try:
+            for indice, resultado in _lancar(bloco.name, layout, pendentes, processos):
+                tarefa = pendentes[indice]
+                tarefa.funcao.guardar(resultado, df, *tarefa.argumentos)
+        finally:
+            bloco.close()
+            bloco.unlink()
+    return [t.nome for t in pendentes]
+
+
+def _preparar_versao(df, processos):
+    # O cubo de contagens serve todas as tabelas de contingência: é montado
+    # primeiro, aqui mesmo, e fixado no cache (não sai por falta de espaço)
+    cubo_do_dataset.fixar(df)
+    pre_calcular(df, processos)
+
+
+def pre_calcular_em_segundo_plano(df, processos=None):
+    """Monta o cubo de contagens e dispara ``pre_calcular`` numa thread, uma única vez por versão do dataset.
+
+    Devolve a thread, ou ``None`` se essa versão já foi disparada (ou não há
+    versão). Resultados que depois saírem do cache por falta de espaço são
+    recalculados quando alguém abrir a seção, sem recriar o pool; o cubo não
+    sai.
+    """
+    versao = df.attrs.get('versao')
+    if versao is None:
+        return None
+    with _lock_versoes:
+        if versao in _versoes_iniciadas:
+            return None
+        _versoes_iniciadas.add(versao)
+    thread = threading.Thread(target=_preparar_versao, args=(df, processos), name=f'pre_calculo-{versao}',
+                              daemon=True)
+    thread.start()
+    return thread
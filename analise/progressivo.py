@@ -0,0 +1,124 @@
+"""Cálculo das seções pesadas em segundo plano, com prévia numa amostra das linhas.
+
+As superfícies de densidade e a matriz de correlação percorrem o dataset
+inteiro e, com milhões de linhas, levam segundos. ``calcular`` entrega esses
+cálculos a um pool de threads e devolve um ``Future``: a página mostra logo
+as partes baratas e uma prévia feita com ``amostra_do_dataset`` (o mesmo
+cálculo sobre no máximo ``TAMANHO_AMOSTRA`` linhas, numa fração do tempo), e
+troca a prévia pelo resultado completo quando ele fica pronto.
+
+Pedidos iguais (mesma versão do dataset, seção e argumentos) de sessões
+diferentes compartilham o mesmo cálculo. A sessão é identificada junto com
+o número da execução do script; depois de pedir os gráficos da página, cada
+execução chama ``liberar`` e a sessão desiste do que pediu em execuções
+anteriores e não voltou a pedir (outra página, filtros ou parâmetros
+mudaram). Os cálculos que nenhuma outra sessão espera saem da fila ou, se
+já começaram, recebem o sinal de ``analise.interrupcao`` e param no próximo
+pedaço.
+
+A prévia usa uma amostra das linhas, não uma grade mais grossa: o custo das
+seções vem do número de linhas, e a grade de saída já é pequena.
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from analise.cache import por_versao
+from analise.filtros import Selecao
+from analise.interrupcao import executar_com_sinal
+
+# Acima disso as seções pesadas mostram antes uma prévia calculada numa amostra
+TAMANHO_AMOSTRA = 50_000
+
+TRABALHADORES = min(4, os.cpu_count() or 1)
+
+_executor = None
+_pendentes = {}  # (versão, função, argumentos) -> (future, {sessão: execução que pediu}, sinal)
+_lock = threading.RLock()  # cancelar um future chama _concluido com o lock já tomado
+
+
+@por_versao
+def amostra_do_dataset(dados):
+    """Linhas igualmente espaçadas dos dados (DataFrame ou ``Selecao``), ou ``None`` se não há o que amostrar.
+
+    A amostra tem versão própria, então as prévias também ficam memorizadas.
+    """
+    if isinstance(dados, Selecao):
+        linhas = dados.linhas
+    elif isinstance(dados, pd.DataFrame):
+        linhas = np.arange(len(dados))
+    else:
+        return None  # agregados não têm linhas
+    if len(linhas) <= TAMANHO_AMOSTRA:
+        return None
+    linhas = linhas[::-(-len(linhas) // TAMANHO_AMOSTRA)]
+    amostra = (dados.df if isinstance(dados, Selecao) else dados).take(linhas).reset_index(drop=True)
+    amostra.attrs = {}
+    if 'versao' in dados.attrs:
+        amostra.attrs['versao'] = f"{dados.attrs['versao']}|amostra"
+    return amostra
+
+
+def _pool():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(TRABALHADORES, thread_name_prefix='secao')
+        return _executor
+
+
+def _concluido(chave, futuro):
+    with _lock:
+        if chave in _pendentes and _pendentes[chave][0] is futuro:
+            del _pendentes[chave]
+
+
+def calcular(sessao, funcao, dados, *args):
+    """``Future`` com ``funcao(dados, *args)`` (uma função de ``analise.secoes``), calculado numa thread.
+
+    ``sessao`` é ``(identificador, execução)``, com a execução crescendo a cada vez que o script roda.
+    """
+    if funcao.memorizado(dados, *args):
+        futuro = Future()
+        futuro.set_result(funcao(dados, *args))
+        return futuro
+    versao = dados.attrs.get('versao')
+    chave = None if versao is None else (versao, funcao.__module__, funcao.__qualname__, args)
+    pool = _pool()
+    identificador, execucao = sessao
+    with _lock:
+        if chave in _pendentes:
+            futuro, sessoes, _ = _pendentes[chave]
+            sessoes[identificador] = max(execucao, sessoes.get(identificador, execucao))
+            return futuro
+        sinal = threading.Event()
+        futuro = pool.submit(executar_com_sinal, sinal, funcao, dados, *args)
+        if chave is not None:
+            _pendentes[chave] = (futuro, {identificador: execucao}, sinal)
+    if chave is not None:
+        futuro.add_done_callback(lambda f: _concluido(chave, f))
+    return futuro
+
+
+def liberar(sessao):
+    """Desiste dos cálculos que a sessão pediu antes desta execução e não voltou a pedir.
+
+    Os que nenhuma outra sessão espera saem da fila ou são interrompidos no
+    próximo pedaço; devolve quantos foram cancelados.
+    """
+    identificador, atual = sessao
+    cancelados = 0
+    with _lock:
+        for chave, (futuro, sessoes, sinal) in list(_pendentes.items()):
+            if sessoes.get(identificador, atual) < atual:
+                del sessoes[identificador]
+            if not sessoes:
+                if not futuro.cancel():
+                    sinal.set()
+                _pendentes.pop(chave, None)
+                cancelados += 1
+    return cancelados
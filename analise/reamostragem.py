@@ -0,0 +1,88 @@
+"""Intervalos de confiança por bootstrap e teste de permutação para diferenças de médias.
+
+As reamostragens são feitas sobre a tabela de contagens ``grupo x valor``
+(a mesma de ``analise.estatisticas``), não sobre as linhas. Reamostrar com
+reposição as ``n`` linhas de um grupo equivale a sortear quantas vezes cada
+valor distinto aparece, ``Multinomial(n, contagens / n)``; permutar os
+rótulos dos dois grupos equivale a sortear a parte do primeiro grupo na
+tabela somada, uma hipergeométrica multivariada. Cada reamostra custa
+então o número de valores distintos (notas: ~50) em vez do número de
+linhas, e milhares delas saem de uma única chamada do gerador, em pedaços
+de até ``LIMITE_CELULAS`` contagens para limitar a memória.
+
+O resultado é exatamente o do bootstrap por índices (estratificado: o
+tamanho de cada grupo é mantido) e o do teste de permutação usual. Como só
+as contagens são usadas, o mesmo cálculo serve aos agregados do modo por
+partes.
+"""
+
+import collections
+
+import numpy as np
+
+from analise.interrupcao import verificar
+
+REAMOSTRAS = 10_000
+
+# Contagens por pedaço de reamostras (reamostras x valores distintos)
+LIMITE_CELULAS = 2_000_000
+
+Intervalo = collections.namedtuple('Intervalo', 'diferenca inferior superior p_valor confianca reamostras')
+
+
+def _pedacos(reamostras, valores):
+    por_pedaco = max(1, LIMITE_CELULAS // max(valores, 1))
+    for inicio in range(0, reamostras, por_pedaco):
+        verificar()  # em segundo plano, o cálculo pode ser cancelado entre os pedaços
+        yield min(por_pedaco, reamostras - inicio)
+
+
+def medias_bootstrap(contagens, valores, reamostras=REAMOSTRAS, semente=0):
+    """Média de cada reamostra bootstrap de um grupo dado pelas contagens de cada valor."""
+    rng = np.random.default_rng(semente)
+    n = int(contagens.sum())
+    proporcoes = contagens / n
+    valores = np.asarray(valores, dtype=np.float64)
+    return np.concatenate([rng.multinomial(n, proporcoes, size=tamanho) @ valores / n
+                           for tamanho in _pedacos(reamostras, len(valores))])
+
+
+def diferencas_permutacao(contagens_a, contagens_b, valores, reamostras=REAMOSTRAS, semente=0):
+    """Diferença ``b - a`` das médias com os rótulos dos grupos embaralhados, para cada reamostra."""
+    rng = np.random.default_rng(semente)
+    juntas = (contagens_a + contagens_b).astype(np.int64)
+    n_a, n_b = int(contagens_a.sum()), int(contagens_b.sum())
+    valores = np.asarray(valores, dtype=np.float64)
+    soma_total = juntas @ valores
+    diferencas = []
+    for tamanho in _pedacos(reamostras, len(valores)):
+        soma_a = rng.multivariate_hypergeometric(juntas, n_a, size=tamanho) @ valores
+        diferencas.append((soma_total - soma_a) / n_b - soma_a / n_a)
+    return np.concatenate(diferencas)
+
+
+def diferenca_de_medias(contagens, valores, reamostras=REAMOSTRAS, confianca=0.95, semente=0):
+    """Diferença entre as médias do segundo e do primeiro grupo de uma tabela ``2 x valores``.
+
+    O intervalo é o de percentis do bootstrap; o p-valor é o do teste de
+    permutação bilateral. Se algum grupo está vazio, tudo fica NaN.
+    """
+    contagens = np.asarray(contagens)
+    contagens_a, contagens_b = contagens[0], contagens[1]
+    if contagens_a.sum() == 0 or contagens_b.sum() == 0:
+        return Intervalo(np.nan, np.nan, np.nan, np.nan, confianca, reamostras)
+    valores = np.asarray(valores, dtype=np.float64)
+    diferenca = contagens_b @ valores / contagens_b.sum() - contagens_a @ valores / contagens_a.sum()
+
+    # Sementes diferentes para os dois grupos e para a permutação
+    sementes = np.random.SeedSequence(semente).spawn(3)
+    bootstrap = (medias_bootstrap(contagens_b, valores, reamostras, sementes[1])
+                 - medias_bootstrap(contagens_a, valores, reamostras, sementes[0]))
+    alfa = 1 - confianca
+    inferior, superior = np.quantile(bootstrap, [alfa / 2, 1 - alfa / 2])
+
+    permutadas = diferencas_permutacao(contagens_a, contagens_b, valores, reamostras, sementes[2])
+    # Tolerância para empates que só diferem pelo arredondamento das somas
+    extremas = np.count_nonzero(np.abs(permutadas) >= abs(diferenca) - 1e-9)
+    p_valor = float((extremas + 1) / (reamostras + 1))
+    return Intervalo(float(diferenca), float(inferior), float(superior), p_valor, confianca, reamostras)
@@ -0,0 +1,272 @@
+"""Exportação do relatório sem o servidor do Streamlit.
+
+Cada seção do dashboard vira um conjunto de arquivos numa pasta: as tabelas
+em CSV e/ou Parquet e as figuras em HTML, JSON (especificação do Plotly) e/ou
+PNG. As figuras são as mesmas do dashboard (``analise.graficos``).
+
+Uma seção só é gravada de novo quando as suas entradas mudam: a chave de
+cada seção combina o hash das colunas que ela lê (as colunas das suas
+``Tarefa`` em ``analise.pre_calculo``), o filtro aplicado e os formatos
+pedidos, e fica no ``manifesto.json`` da pasta. Mudar uma coluna do CSV
+refaz só as seções que a usam.
+
+O PNG das figuras do Plotly precisa do pacote opcional ``kaleido``; sem
+ele essas figuras são gravadas só nos outros formatos.
+"""
+
+import collections
+import hashlib
+import importlib.util
+import json
+import os
+import pathlib
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from analise import graficos, secoes
+from analise.agregados import Agregados
+from analise.cache import por_versao
+from analise.filtros import MINIMO_ALUNOS, Selecao
+from analise.pre_calculo import TAREFAS, pre_calcular
+
+# Aumentar quando o conteúdo ou o formato dos arquivos mudar, para regravar tudo
+VERSAO_RELATORIO = 3
+
+FORMATOS_TABELA = ('csv', 'parquet')
+FORMATOS_FIGURA = ('html', 'json', 'png')
+
+MANIFESTO = 'manifesto.json'
+
+# montar(dados) -> ({nome: tabela}, {nome: figura}); tarefas: nomes em ``pre_calculo.TAREFAS``
+Secao = collections.namedtuple('Secao', 'nome tarefas montar')
+
+_TAREFAS_POR_NOME = {t.nome: t for t in TAREFAS}
+
+
+def _grade(eixo_x, eixo_y, z_grid, nome_x, nome_y):
+    """Grade de densidade como tabela: uma linha por ponto do eixo y, uma coluna por ponto do eixo x."""
+    return pd.DataFrame(z_grid, index=pd.Index(eixo_y, name=nome_y), columns=pd.Index(eixo_x, name=nome_x))
+
+
+def _densidades(eixo_notas, densidades):
+    """Curvas da seção 5.3 como tabela: uma linha por nota, uma coluna por quantidade de horas de sono."""
+    tabela = densidades.T
+    tabela.index = pd.Index(eixo_notas, name='Exam_Score')
+    return tabela
+
+
+def _intervalo(intervalo):
+    """Diferença de médias com intervalo de confiança, numa tabela de uma linha."""
+    return pd.DataFrame([intervalo._asdict()])
+
+
+def _notas(dados):
+    frequencias = secoes.frequencia_notas(dados)
+    return ({'frequencia_notas': frequencias},
+            {'frequencia_notas': graficos.barras(frequencias, 'Distribuição de frequência de notas entre 50 e 100')})
+
+
+def _escolas(dados):
+    medias = secoes.medias_por_escola(dados)
+    absoluta, percentual = secoes.recursos_por_escola(dados)
+    tabelas = {'medias_por_escola': medias, 'diferenca_por_escola': _intervalo(secoes.diferenca_por_escola(dados)),
+               'recursos_por_escola': absoluta,
+               'recursos_por_escola_percentual': percentual}
+    figuras = {'medias_por_escola': graficos.barras(medias, 'Média no exame por tipo de escola'),
+               'recursos_por_escola_percentual': graficos.barras(percentual, 'Acesso a recursos por tipo de escola (%)')}
+    return tabelas, figuras
+
+
+def _internet(dados):
+    medias = secoes.medias_por_internet(dados)
+    total, por_linha = secoes.recursos_por_dificuldade(dados)
+    quantidade, media = secoes.reforco(dados)
+    tabelas = {'medias_por_internet': medias,
+               'diferenca_por_internet': _intervalo(secoes.diferenca_por_internet(dados)),
+               'recursos_por_dificuldade': total,
+               'recursos_por_dificuldade_por_linha': por_linha,
+               'alunos_por_reforco': quantidade, 'medias_por_reforco': media}
+    figuras = {
+        'medias_por_internet': graficos.barras(medias, 'Média no exame com e sem acesso à internet'),
+        'recursos_por_dificuldade_por_linha': graficos.barras(
+            por_linha, 'Acesso a recursos por dificuldade de aprendizado (%)'),
+        'alunos_por_reforco': graficos.barras(quantidade, 'Alunos por aulas de reforço semanais'),
+        'medias_por_reforco': graficos.barras(media, 'Média no exame por aulas de reforço semanais'),
+    }
+    return tabelas, figuras
+
+
+def _distribuicao(dados):
+    contagens, bordas = secoes.distribuicao_notas(dados)
+    tabela = pd.DataFrame({'inicio': bordas[:-1], 'fim': bordas[1:], 'frequencia': contagens})
+    return {'distribuicao_notas': tabela}, {'distribuicao_notas': graficos.histograma_notas(contagens, bordas)}
+
+
+def _estudo(dados):
+    tabelas, figuras = {}, {}
+    for secao, nome, montar in (('5.1', 'estudo_notas', graficos.superficie_estudo_notas),
+                                ('5.2', 'sono_estudo', graficos.superficie_sono_estudo)):
+        argumentos = secoes.SUPERFICIES[secao]
+        eixo_x, eixo_y, z_grid = secoes.superficie(dados, *argumentos)
+        tabelas[nome] = _grade(eixo_x, eixo_y, z_grid, *argumentos[:2])
+        figuras[nome] = montar(eixo_x, eixo_y, z_grid)
+
+    eixo_notas, densidades = secoes.densidades_notas_por_sono(dados)
+    tabelas['notas_por_sono'] = _densidades(eixo_notas, densidades)
+    figuras['notas_por_sono'] = graficos.densidades_por_sono(
+        eixo_notas, densidades, secoes.HORAS_SONO, 'Distribuição de Notas por Horas de Sono', (50, 80), (0, 0.05))
+    eixo_notas, densidades = secoes.densidades_notas_por_sono(dados, 80, 100)
+    tabelas['notas_por_sono_80_100'] = _densidades(eixo_notas, densidades)
+    figuras['notas_por_sono_80_100'] = graficos.densidades_por_sono(
+        eixo_notas, densidades, secoes.HORAS_SONO, 'Distribuição de Notas por Horas de Sono (Notas entre 80 e 100)',
+        (80, 100), (0, 0.01), template='plotly_white')
+    return tabelas, figuras
+
+
+def _correlacao(dados):
+    matriz = secoes.correlacao(dados)
+    return {'correlacao': matriz}, {'correlacao': graficos.mapa_correlacao(matriz)}
+
+
+def _presenca(dados):
+    argumentos = secoes.SUPERFICIES['7']
+    eixo_x, eixo_y, z_grid = secoes.superficie(dados, *argumentos)
+    return ({'presenca_notas': _grade(eixo_x, eixo_y, z_grid, *argumentos[:2])},
+            {'presenca_notas': graficos.superficie_presenca_notas(eixo_x, eixo_y, z_grid)})
+
+
+# Mesmas seções (e endereços) das páginas do dashboard
+SECOES = [
+    Secao('notas', ['frequencia_notas'], _notas),
+    Secao('escolas', ['medias_por_escola', 'diferenca_por_escola', 'recursos_por_escola'], _escolas),
+    Secao('internet', ['medias_por_internet', 'diferenca_por_internet', 'recursos_por_dificuldade', 'reforco'],
+          _internet),
+    Secao('distribuicao', ['distribuicao_notas'], _distribuicao),
+    Secao('estudo', ['superficie 5.1', 'superficie 5.2', 'densidades_notas_por_sono',
+                     'densidades_notas_por_sono 80-100'], _estudo),
+    Secao('correlacao', ['correlacao'], _correlacao),
+    Secao('presenca', ['superficie 7'], _presenca),
+]
+
+
+# Chave de cada seção
+
+@por_versao
+def _hash_coluna(df, coluna):
+    """Hash dos valores (ou códigos) de uma coluna, uma vez por versão do dataset."""
+    serie = df[coluna]
+    valores = serie.cat.codes.to_numpy() if isinstance(serie.dtype, pd.CategoricalDtype) else serie.to_numpy()
+    return hashlib.sha256(np.ascontiguousarray(valores).tobytes()).hexdigest()
+
+
+def _colunas(secao):
+    return sorted({c for nome in secao.tarefas for c in _TAREFAS_POR_NOME[nome].colunas})
+
+
+def chave(dados, secao, formatos_tabela, formatos_figura):
+    """Resumo de tudo de que os arquivos da seção dependem."""
+    if isinstance(dados, Selecao):
+        base, selecao = dados.df, hashlib.sha256(dados.bitset.tobytes()).hexdigest()
+    else:
+        base, selecao = dados, None
+    if isinstance(base, Agregados):
+        # Sem as linhas, qualquer mudança no arquivo muda todas as seções
+        colunas = {c: base.attrs['versao'] for c in _colunas(secao)}
+    else:
+        colunas = {c: _hash_coluna(base, c) for c in _colunas(secao)}
+    conteudo = json.dumps([VERSAO_RELATORIO, secao.nome, sorted(formatos_tabela), sorted(formatos_figura),
+                           selecao, colunas], sort_keys=True)
+    return hashlib.sha256(conteudo.encode()).hexdigest()
+
+
+# Gravação
+
+def _gravar_atomico(caminho, texto):
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    temporario.write_text(texto, encoding='utf-8')
+    os.replace(temporario, caminho)
+
+
+def _ler_manifesto(destino):
+    try:
+        return json.loads((destino / MANIFESTO).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def png_disponivel():
+    """O PNG das figuras do Plotly precisa do ``kaleido``."""
+    return importlib.util.find_spec('kaleido') is not None
+
+
+def _gravar_tabela(tabela, caminho, formato):
+    if formato == 'csv':
+        tabela.to_csv(caminho)
+    else:
+        # O Parquet exige nomes de coluna em texto
+        tabela = tabela.rename(columns=str)
+        tabela.columns.name = None
+        tabela.to_parquet(caminho)
+
+
+def _gravar_figura(figura, caminho_sem_extensao, formatos):
+    """Grava a figura nos formatos possíveis e devolve os arquivos gravados."""
+    arquivos = []
+    for formato in formatos:
+        caminho = caminho_sem_extensao.with_suffix('.' + formato)
+        if formato == 'html':
+            figura.write_html(caminho, include_plotlyjs='cdn')
+        elif formato == 'json':
+            figura.write_json(caminho)
+        elif png_disponivel():
+            figura.write_image(caminho)
+        else:
+            continue
+        arquivos.append(caminho)
+    return arquivos
+
+
+def exportar(dados, destino, formatos_tabela=('csv',), formatos_figura=('html',), processos=1,
+             secoes_do_relatorio=SECOES):
+    """Grava em ``destino`` os arquivos das seções cujas entradas mudaram.
+
+    Devolve ``(gravadas, puladas)``, os nomes das seções. Com mais de um
+    processo e um DataFrame completo, os cálculos das seções pendentes rodam
+    em paralelo (``pre_calcular``) antes da gravação. Seleções com menos de
+    ``MINIMO_ALUNOS`` alunos não geram arquivos, como no dashboard.
+    """
+    if isinstance(dados, Agregados) and dados.total < MINIMO_ALUNOS:
+        warnings.warn(f'{destino}: só {dados.total} aluno(s) na seleção; relatório não gravado')
+        return [], [s.nome for s in secoes_do_relatorio]
+    destino = pathlib.Path(destino)
+    destino.mkdir(parents=True, exist_ok=True)
+    if 'png' in formatos_figura and not png_disponivel():
+        warnings.warn('kaleido não está instalado: as figuras do Plotly não serão gravadas em PNG')
+
+    manifesto = _ler_manifesto(destino)
+    chaves = {s.nome: chave(dados, s, formatos_tabela, formatos_figura) for s in secoes_do_relatorio}
+    pendentes = [s for s in secoes_do_relatorio
+                 if manifesto.get(s.nome, {}).get('chave') != chaves[s.nome]
+                 or not all((destino / a).exists() for a in manifesto[s.nome]['arquivos'])]
+
+    if isinstance(dados, pd.DataFrame) and pendentes:
+        pre_calcular(dados, processos, [_TAREFAS_POR_NOME[t] for s in pendentes for t in s.tarefas])
+
+    for secao in pendentes:
+        tabelas, figuras = secao.montar(dados)
+        arquivos = []
+        for nome, tabela in tabelas.items():
+            for formato in formatos_tabela:
+                caminho = destino / f'{secao.nome}-{nome}.{formato}'
+                _gravar_tabela(tabela, caminho, formato)
+                arquivos.append(caminho)
+        for nome, figura in figuras.items():
+            arquivos += _gravar_figura(figura, destino / f'{secao.nome}-{nome}', formatos_figura)
+        manifesto[secao.nome] = {'chave': chaves[secao.nome],
+                                 'arquivos': sorted(str(a.relative_to(destino)) for a in arquivos)}
+        # Depois de cada seção, para que uma interrupção não perca as já gravadas
+        _gravar_atomico(destino / MANIFESTO, json.dumps(manifesto, indent=2, ensure_ascii=False))
+
+    return [s.nome for s in pendentes], [s.nome for s in secoes_do_relatorio if s not in pendentes]
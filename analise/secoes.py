@@ -0,0 +1,208 @@
+"""Cálculos de cada seção do dashboard, separados da parte visual.
+
+Cada função recebe o dataset e devolve apenas os dados que a seção mostra
+(tabelas, grades de densidade, ...). O dataset pode ser o DataFrame
+carregado por ``analise.dados`` ou os ``Agregados`` do modo por partes
+(``analise.agregados``); as duas formas dão o mesmo resultado. Os
+resultados são memorizados pela versão do dataset, então uma seção só é
+calculada quando alguém a abre pela primeira vez. Com o painel de desempenho
+ligado, cada chamada aparece como um trecho medido (``analise.perfil``).
+"""
+
+import numpy as np
+import pandas as pd
+
+from analise.agregados import Agregados, _niveis
+from analise.cache import por_versao
+from analise.correlacao import matriz_correlacao
+from analise.cubo import cubo_do_dataset
+from analise.densidade import densidade_2d, densidades_por_grupo
+from analise.estatisticas import codificar_grupos, estatisticas_por_grupo
+from analise.histograma import histograma_da_coluna
+from analise.perfil import medido
+from analise.reamostragem import diferenca_de_medias
+
+NOMES_AULAS = ["Nenhuma", "Uma aula", "Duas aulas", "Três aulas", "Quatro aulas", "Cinco aulas", "Seis aulas", "Sete aulas", "Oito aulas"]
+
+# Horas de sono comparadas na seção 5.3
+HORAS_SONO = [7, 8, 4, 10]
+
+# Superfícies de densidade: (coluna x, coluna y, eixo x, eixo y), eixos como (inicio, fim, pontos)
+SUPERFICIES = {
+    '5.1': ('Exam_Score', 'Hours_Studied', (60, 75, 30), (10, 30, 30)),
+    '5.2': ('Sleep_Hours', 'Hours_Studied', (4, 10, 6), (10, 30, 20)),
+    '7': ('Exam_Score', 'Attendance', (60, 75, 30), (55, 100, 50)),
+}
+
+
+# Operações básicas, sobre o DataFrame ou sobre os agregados
+
+def _estatisticas(dados, coluna_grupo, coluna_valor):
+    if isinstance(dados, Agregados):
+        return dados.estatisticas_por_grupo(coluna_grupo, coluna_valor)
+    return estatisticas_por_grupo(dados, coluna_grupo, coluna_valor)
+
+
+def _cubo(dados):
+    return dados.cubo() if isinstance(dados, Agregados) else cubo_do_dataset(dados)
+
+
+def _histograma(dados, coluna, bins, range=None):
+    # As contagens por valor são calculadas uma vez; cada histograma sai das somas acumuladas
+    if isinstance(dados, Agregados):
+        return dados.histograma(coluna, bins, range)
+    return histograma_da_coluna(dados, coluna).histograma(bins, range)
+
+
+def _contagens_por_grupo(dados, coluna_grupo, coluna_valor, grupos):
+    """Tabela de contagens ``grupos x valores`` e os valores (só os que aparecem)."""
+    if isinstance(dados, Agregados):
+        tabela, niveis = dados.conjunta(coluna_grupo, coluna_valor), _niveis(coluna_grupo)
+        valores = np.asarray(_niveis(coluna_valor))
+    else:
+        codigos_grupo, niveis = codificar_grupos(dados[coluna_grupo])
+        codigos_valor, valores = codificar_grupos(dados[coluna_valor])
+        validos = (codigos_grupo >= 0) & (codigos_valor >= 0)
+        celulas = codigos_grupo[validos].astype(np.intp) * len(valores) + codigos_valor[validos]
+        tabela = np.bincount(celulas, minlength=len(niveis) * len(valores)).reshape(len(niveis), len(valores))
+        valores = np.asarray(valores)
+    tabela = tabela[[niveis.get_loc(g) for g in grupos]]
+    presentes = np.flatnonzero(tabela.sum(axis=0))
+    return tabela[:, presentes], valores[presentes]
+
+
+def _extremos(dados, coluna):
+    if isinstance(dados, Agregados):
+        return dados.minimo(coluna), dados.maximo(coluna)
+    return dados[coluna].min(), dados[coluna].max()
+
+
+# 1. Frequência de notas
+
+@medido
+@por_versao
+def frequencia_notas(df, largura=1):
+    """Quantidade de notas em cada faixa de ``largura`` pontos entre 50 e 100."""
+    bin_edges = np.arange(50, 100 + largura, largura)
+    frequencias, bins = _histograma(df, 'Exam_Score', bin_edges)
+    return pd.DataFrame({
+        'Nota': bins[:-1],
+        'Frequência': frequencias
+    }).set_index('Nota')
+
+
+# 2. Instituições públicas e privadas
+
+@medido
+@por_versao
+def medias_por_escola(df):
+    notas_por_escola = _estatisticas(df, 'School_Type', 'Exam_Score')
+    return pd.DataFrame({
+        'Instituição': ['Públicas', 'Privadas'],
+        'Média': [notas_por_escola.loc['Public', 'media'], notas_por_escola.loc['Private', 'media']]
+    }).set_index('Instituição')
+
+
+@medido
+@por_versao
+def diferenca_por_escola(df):
+    """Diferença entre as médias das escolas privadas e públicas, com intervalo de confiança."""
+    return diferenca_de_medias(*_contagens_por_grupo(df, 'School_Type', 'Exam_Score', ['Public', 'Private']))
+
+
+@medido
+@por_versao
+def recursos_por_escola(df):
+    """Tabelas absoluta e percentual de acesso a recursos por tipo de escola."""
+    cubo = _cubo(df)
+    absoluta = cubo.crosstab('School_Type', 'Access_to_Resources',
+                             margins=True, margins_name="Número total de alunos")
+    percentual = cubo.crosstab('School_Type', 'Access_to_Resources', normalize="index",
+                               margins=True, margins_name="Percentual de alunos").mul(100).round(1)
+    return absoluta, percentual
+
+
+# 3. Internet e recursos educacionais
+
+@medido
+@por_versao
+def medias_por_internet(df):
+    # Um grupo pode não existir quando o dataset está filtrado: a média fica NaN
+    notas_por_internet = _estatisticas(df, 'Internet_Access', 'Exam_Score').reindex([False, True])
+    return pd.DataFrame({
+        'Acesso a internet': ['Sem acesso', 'Com acesso'],
+        'Média': [notas_por_internet.loc[False, 'media'], notas_por_internet.loc[True, 'media']]
+    }).set_index('Acesso a internet')
+
+
+@medido
+@por_versao
+def diferenca_por_internet(df):
+    """Diferença entre as médias com e sem acesso à internet, com intervalo de confiança."""
+    return diferenca_de_medias(*_contagens_por_grupo(df, 'Internet_Access', 'Exam_Score', [False, True]))
+
+
+@medido
+@por_versao
+def recursos_por_dificuldade(df):
+    """Percentual sobre o total e percentual por linha de acesso a recursos x dificuldade de aprendizado."""
+    cubo = _cubo(df)
+    total = cubo.crosstab('Learning_Disabilities', 'Access_to_Resources', normalize=True,
+                          margins=True, margins_name="Percentual de alunos").mul(100).round(1)
+    por_linha = cubo.crosstab('Learning_Disabilities', 'Access_to_Resources', normalize="index",
+                              margins=True, margins_name="total").mul(100).round(1)
+    return total, por_linha.drop('total', axis=0)
+
+
+@medido
+@por_versao
+def reforco(df):
+    """Quantidade de alunos e média das notas por quantidade de aulas de reforço semanais."""
+    notas_por_reforco = _estatisticas(df, 'Tutoring_Sessions', 'Exam_Score')
+    categorias = [NOMES_AULAS[n] if n < len(NOMES_AULAS) else f"{n} aulas" for n in notas_por_reforco.index]
+    indice = pd.CategoricalIndex(categorias, categories=categorias, ordered=True, name="Categorias")
+    quantidade = pd.DataFrame({"Valores": notas_por_reforco['contagem'].to_numpy()}, index=indice)
+    medias = pd.DataFrame({"Valores": notas_por_reforco['media'].to_numpy()}, index=indice)
+    return quantidade, medias
+
+
+# 4. Distribuição de notas
+
+@medido
+@por_versao
+def distribuicao_notas(df, bins=45):
+    """Contagens e bordas do histograma das notas."""
+    return _histograma(df, 'Exam_Score', bins)
+
+
+# 5. Horas de estudo, sono e notas / 7. Presença e notas
+
+@medido
+@por_versao
+def superficie(df, coluna_x, coluna_y, eixo_x, eixo_y):
+    """Densidade conjunta de duas colunas; eixos no formato ``(inicio, fim, pontos)``."""
+    eixo_x, eixo_y = np.linspace(*eixo_x), np.linspace(*eixo_y)
+    if isinstance(df, Agregados):
+        return eixo_x, eixo_y, df.densidade_2d(coluna_x, coluna_y, eixo_x, eixo_y)
+    return eixo_x, eixo_y, densidade_2d(df[coluna_x], df[coluna_y], eixo_x, eixo_y)
+
+
+@medido
+@por_versao
+def densidades_notas_por_sono(df, inicio=None, fim=None, pontos=500):
+    """Densidade das notas para cada quantidade de horas de sono no trecho ``[inicio, fim]``."""
+    minimo, maximo = _extremos(df, 'Exam_Score')
+    eixo_notas = np.linspace(minimo if inicio is None else inicio, maximo if fim is None else fim, pontos)
+    if isinstance(df, Agregados):
+        return eixo_notas, df.densidades_por_grupo('Sleep_Hours', 'Exam_Score', eixo_notas)
+    return eixo_notas, densidades_por_grupo(df, 'Sleep_Hours', 'Exam_Score', eixo_notas)
+
+
+# 6. Matriz correlacional
+
+@medido
+@por_versao
+def correlacao(df):
+    if isinstance(df, Agregados):
+        return df.matriz_correlacao()
+    return matriz_correlacao(df)
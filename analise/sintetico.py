@@ -0,0 +1,235 @@
+"""Gerador de dados sintéticos com o esquema do CSV, para testes de carga.
+
+Duplicar linhas do CSV cria "picos" artificiais (cada combinação aparece
+milhares de vezes), o que deforma as densidades e não acrescenta nenhuma
+variação. Aqui o dataset é descrito por um modelo pequeno ajustado ao CSV:
+
+* cada coluna (menos ``Exam_Score``) tem a sua distribuição marginal
+  empírica, com os mesmos níveis e frequências (inclusive valores ausentes
+  e faixas como Tutoring_Sessions 0–8 e Sleep_Hours 4–10);
+* a dependência entre essas colunas vem de uma cópula gaussiana: as colunas
+  são levadas a escores normais, cuja matriz de correlação é estimada; as
+  linhas novas são normais correlacionadas transformadas de volta em cada
+  marginal;
+* ``Exam_Score`` é uma regressão linear nas demais colunas (Hours_Studied,
+  Attendance, ...) mais um resíduo sorteado entre os resíduos observados,
+  arredondada e limitada à faixa do CSV.
+
+Linhas novas saem em pedaços independentes; cada pedaço tem a sua semente
+(derivada da semente geral e do número do pedaço), então o arquivo gerado é
+o mesmo qualquer que seja o número de processos.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+from analise.dados import COLUNAS_BOOLEANAS, COLUNAS_CATEGORICAS, ESQUEMA
+
+COLUNA_ALVO = 'Exam_Score'
+
+TAMANHO_CHUNK = 250_000
+
+FORMATOS = ('csv', 'parquet')
+
+
+def _codigos(serie):
+    """Valores da coluna como inteiros: posição da categoria (-1 = ausente), 0/1 ou o próprio número."""
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.cat.codes.to_numpy().astype(np.int64)
+    return serie.to_numpy().astype(np.int64)
+
+
+def _coluna(codigos, nome):
+    """Converte códigos inteiros de volta para o tipo da coluna no ``ESQUEMA``."""
+    tipo = ESQUEMA[nome]
+    if nome in COLUNAS_CATEGORICAS:
+        return pd.Categorical.from_codes(codigos, dtype=tipo)
+    return codigos.astype(tipo)
+
+
+class ModeloSintetico:
+    """Marginais, cópula gaussiana e regressão da nota, ajustadas a um DataFrame."""
+
+    def __init__(self, colunas, niveis, acumuladas, cholesky, efeitos, intercepto, residuos, limites):
+        self.colunas = colunas        # colunas da cópula (todas menos a nota)
+        self.niveis = niveis          # por coluna: códigos possíveis, em ordem
+        self.acumuladas = acumuladas  # por coluna: distribuição acumulada sobre ``niveis``
+        self.cholesky = cholesky      # fator da correlação dos escores normais
+        self.efeitos = efeitos        # por coluna: contribuição de cada nível para a nota
+        self.intercepto = intercepto
+        self.residuos = residuos
+        self.limites = limites        # menor e maior nota observadas
+
+    @classmethod
+    def ajustar(cls, df, semente=0):
+        rng = np.random.default_rng(semente)
+        colunas = [c for c in ESQUEMA if c != COLUNA_ALVO]
+        niveis, acumuladas, escores, indices = [], [], [], []
+        for col in colunas:
+            valores, indice, contagens = np.unique(_codigos(df[col]), return_inverse=True, return_counts=True)
+            acumulada = np.cumsum(contagens) / len(df)
+            # Escore normal de cada linha: sorteado dentro do intervalo da
+            # acumulada que corresponde ao seu nível (cópula para dados discretos)
+            anterior = np.concatenate([[0.0], acumulada[:-1]])
+            u = anterior[indice] + rng.random(len(df)) * (acumulada - anterior)[indice]
+            escores.append(ndtri(np.clip(u, 1e-12, 1 - 1e-12)))
+            niveis.append(valores)
+            acumuladas.append(acumulada)
+            indices.append(indice)
+
+        correlacao = np.corrcoef(np.vstack(escores))
+        # Garante uma matriz positiva definida antes da fatoração
+        autovalores, autovetores = np.linalg.eigh(correlacao)
+        correlacao = (autovetores * np.maximum(autovalores, 1e-8)) @ autovetores.T
+        d = np.sqrt(np.diag(correlacao))
+        cholesky = np.linalg.cholesky(correlacao / np.outer(d, d))
+
+        # Regressão da nota: linear nas colunas numéricas e booleanas, um
+        # coeficiente por nível (exceto o primeiro) nas categóricas
+        blocos, tamanhos = [np.ones((len(df), 1))], []
+        for col, valores, indice in zip(colunas, niveis, indices):
+            if col in COLUNAS_CATEGORICAS:
+                bloco = np.eye(len(valores))[indice][:, 1:]
+            else:
+                bloco = valores[indice, None].astype(np.float64)
+            blocos.append(bloco)
+            tamanhos.append(bloco.shape[1])
+        desenho = np.hstack(blocos)
+        nota = df[COLUNA_ALVO].to_numpy(np.float64)
+        coeficientes = np.linalg.lstsq(desenho, nota, rcond=None)[0]
+        residuos = nota - desenho @ coeficientes
+
+        efeitos, inicio = [], 1
+        for col, valores, tamanho in zip(colunas, niveis, tamanhos):
+            beta = coeficientes[inicio:inicio + tamanho]
+            if col in COLUNAS_CATEGORICAS:
+                efeitos.append(np.concatenate([[0.0], beta]))
+            else:
+                efeitos.append(valores * beta[0])
+            inicio += tamanho
+
+        return cls(colunas, niveis, acumuladas, cholesky, efeitos, coeficientes[0], residuos,
+                   (int(nota.min()), int(nota.max())))
+
+    def _sortear(self, n, semente, pedaco):
+        """Índices dos níveis de cada coluna da cópula e as notas de ``n`` linhas novas."""
+        rng = np.random.default_rng(np.random.SeedSequence(semente, spawn_key=(pedaco,)))
+        uniformes = ndtr(rng.standard_normal((n, len(self.colunas))) @ self.cholesky.T)
+        indices = []
+        nota = np.full(n, self.intercepto)
+        for j, acumulada in enumerate(self.acumuladas):
+            indice = np.minimum(np.searchsorted(acumulada, uniformes[:, j], side='right'), len(acumulada) - 1)
+            indices.append(indice)
+            nota += self.efeitos[j][indice]
+        nota += rng.choice(self.residuos, n)
+        return indices, np.clip(np.rint(nota), *self.limites).astype(np.int64)
+
+    def gerar(self, n, semente=0, pedaco=0):
+        """``n`` linhas novas com os tipos do ``ESQUEMA``, reprodutíveis por ``(semente, pedaco)``."""
+        indices, nota = self._sortear(n, semente, pedaco)
+        colunas = {col: _coluna(niveis[indice], col) for col, niveis, indice in zip(self.colunas, self.niveis, indices)}
+        colunas[COLUNA_ALVO] = _coluna(nota, COLUNA_ALVO)
+        return pd.DataFrame({col: colunas[col] for col in ESQUEMA})
+
+    def _textos(self, col, niveis):
+        """Como cada nível da coluna aparece no CSV."""
+        if col in COLUNAS_CATEGORICAS:
+            categorias = list(ESQUEMA[col].categories)
+            return ['' if codigo < 0 else categorias[codigo] for codigo in niveis]
+        if col in COLUNAS_BOOLEANAS:
+            return ['Yes' if valor else 'No' for valor in niveis]
+        return [str(valor) for valor in niveis]
+
+    def gerar_csv(self, n, semente=0, pedaco=0, cabecalho=True):
+        """As mesmas linhas de ``gerar(n, semente, pedaco)``, já como bytes de CSV.
+
+        Toda coluna tem poucos níveis, então cada linha é montada copiando o
+        texto pronto de cada nível para a posição certa do buffer de saída,
+        sem passar pelo ``DataFrame.to_csv``.
+        """
+        indices, nota = self._sortear(n, semente, pedaco)
+        minimo, maximo = self.limites
+        tabelas = [self._textos(col, niveis) for col, niveis in zip(self.colunas, self.niveis)]
+        tabelas.append([str(v) for v in range(minimo, maximo + 1)])
+        indices.append(nota - minimo)
+        ordem = [list(ESQUEMA).index(col) for col in self.colunas] + [list(ESQUEMA).index(COLUNA_ALVO)]
+        pares = sorted(zip(ordem, tabelas, indices), key=lambda par: par[0])
+
+        # Texto de cada nível com o separador já incluído, numa matriz de bytes de largura fixa
+        pecas = []
+        for k, (_, textos, indice) in enumerate(pares):
+            fim = '\n' if k == len(pares) - 1 else ','
+            codificados = [(t + fim).encode('utf-8') for t in textos]
+            largura = max(map(len, codificados))
+            matriz = np.zeros((len(codificados), largura), dtype=np.uint8)
+            for i, texto in enumerate(codificados):
+                matriz[i, :len(texto)] = np.frombuffer(texto, dtype=np.uint8)
+            pecas.append((matriz, np.array(list(map(len, codificados))), indice))
+
+        comprimentos = sum(tamanhos[indice] for _, tamanhos, indice in pecas)
+        posicao = np.zeros(n, dtype=np.int64)
+        np.cumsum(comprimentos[:-1], out=posicao[1:])
+        saida = np.empty(int(comprimentos.sum()), dtype=np.uint8)
+        for matriz, tamanhos, indice in pecas:
+            largura = matriz.shape[1]
+            mascara = np.arange(largura) < tamanhos[indice][:, None]
+            saida[(posicao[:, None] + np.arange(largura))[mascara]] = matriz[indice][mascara]
+            posicao += tamanhos[indice]
+        texto = saida.tobytes()
+        if cabecalho:
+            texto = (','.join(ESQUEMA) + '\n').encode('utf-8') + texto
+        return texto
+
+
+def _gerar_pedaco(modelo, n, semente, pedaco, formato):
+    if formato == 'csv':
+        return modelo.gerar_csv(n, semente, pedaco, cabecalho=pedaco == 0)
+    return modelo.gerar(n, semente, pedaco)
+
+
+def gravar(modelo, destino, linhas, semente=0, tamanho_chunk=TAMANHO_CHUNK, processos=None, formato=None):
+    """Grava ``linhas`` linhas sintéticas em ``destino`` (CSV ou Parquet, pela extensão ou por ``formato``).
+
+    Os pedaços são gerados em paralelo em ``processos`` processos (padrão:
+    número de CPUs) e gravados em ordem. Devolve o caminho gravado.
+    """
+    destino = Path(destino)
+    formato = formato or ('parquet' if destino.suffix == '.parquet' else 'csv')
+    if formato not in FORMATOS:
+        raise ValueError(f'formato desconhecido: {formato!r} (use {" ou ".join(FORMATOS)})')
+    if formato == 'parquet':
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as erro:
+            raise ImportError('gravar em Parquet requer o pacote pyarrow') from erro
+
+    tamanhos = [min(tamanho_chunk, linhas - inicio) for inicio in range(0, max(linhas, 1), tamanho_chunk)]
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino.with_name(destino.name + f'.{os.getpid()}.tmp')
+    processos = processos or os.cpu_count() or 1
+    with ProcessPoolExecutor(processos) as executor:
+        pedacos = executor.map(_gerar_pedaco, [modelo] * len(tamanhos), tamanhos, [semente] * len(tamanhos),
+                               range(len(tamanhos)), [formato] * len(tamanhos))
+        if formato == 'csv':
+            with open(temporario, 'wb') as f:
+                for texto in pedacos:
+                    f.write(texto)
+        else:
+            escritor = None
+            try:
+                for df in pedacos:
+                    tabela = pa.Table.from_pandas(df, preserve_index=False)
+                    if escritor is None:
+                        escritor = pq.ParquetWriter(temporario, tabela.schema)
+                    escritor.write_table(tabela)
+            finally:
+                if escritor is not None:
+                    escritor.close()
+    os.replace(temporario, destino)
+    return destino
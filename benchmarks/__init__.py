@@ -0,0 +1 @@
+"""Scripts de benchmark do dashboard (executar com ``python -m benchmarks.<nome>``)."""
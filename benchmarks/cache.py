@@ -0,0 +1,73 @@
+"""Cache de resultados sob muitas variantes de filtros: acertos, remoções e memória.
+
+Simula sessões que abrem seções com filtros sorteados entre ``--variantes``
+combinações (as mais populares saem mais vezes, numa distribuição de Zipf)
+e mostra, para cada orçamento, o aproveitamento do cache, os bytes
+guardados e o pico de memória do processo.
+
+    python -m benchmarks.cache --pedidos 2000 --variantes 300 --orcamentos 1 8 64 --disco .cache/resultados
+"""
+
+import argparse
+import resource
+import sys
+import time
+
+import numpy as np
+
+from analise import cache, secoes
+from analise.dados import carregar_dados
+from analise.filtros import COLUNAS_FILTRAVEIS, ROTULOS_FILTRAVEIS, filtrar
+
+SECOES = [
+    (secoes.medias_por_escola, ()),
+    (secoes.recursos_por_escola, ()),
+    (secoes.distribuicao_notas, ()),
+    (secoes.superficie, secoes.SUPERFICIES['7']),
+]
+
+
+def variantes_de_filtros(quantidade, semente=0):
+    """Filtros sorteados: de uma a três colunas, cada uma com alguns dos seus valores."""
+    rng = np.random.default_rng(semente)
+    variantes = []
+    for _ in range(quantidade):
+        colunas = rng.choice(COLUNAS_FILTRAVEIS, rng.integers(1, 4), replace=False)
+        variantes.append({c: list(rng.choice(ROTULOS_FILTRAVEIS[c], rng.integers(1, len(ROTULOS_FILTRAVEIS[c]) + 1),
+                                             replace=False)) for c in colunas})
+    return variantes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv')
+    parser.add_argument('--pedidos', type=int, default=2000)
+    parser.add_argument('--variantes', type=int, default=300)
+    parser.add_argument('--orcamentos', type=float, nargs='+', default=[1, 8, 64], metavar='MB')
+    parser.add_argument('--disco', metavar='PASTA', help='nível em disco (esvaziado antes de cada orçamento)')
+    args = parser.parse_args(argv)
+
+    df = carregar_dados(args.csv)
+    variantes = variantes_de_filtros(args.variantes)
+    rng = np.random.default_rng(1)
+    pedidos = [(min(rng.zipf(1.3), args.variantes) - 1, rng.integers(len(SECOES))) for _ in range(args.pedidos)]
+
+    print(f"{'MB':>6} {'tempo (s)':>10} {'acertos':>8} {'disco':>6} {'faltas':>7} {'remoções':>9} "
+          f"{'guardado (MB)':>14} {'pico RSS (MB)':>14}")
+    for orcamento in args.orcamentos:
+        cache.configurar(orcamento=int(orcamento * 2**20), diretorio=args.disco)
+        cache.resultados.esvaziar()
+        inicio = time.perf_counter()
+        for variante, secao in pedidos:
+            funcao, argumentos = SECOES[secao]
+            funcao(filtrar(df, variantes[variante]), *argumentos)
+        tempo = time.perf_counter() - inicio
+        uso = cache.estatisticas()
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+        print(f"{orcamento:6g} {tempo:10.2f} {uso['acertos']:8} {uso['acertos_disco']:6} {uso['faltas']:7} "
+              f"{uso['remocoes']:9} {uso['bytes'] / 2**20:14.1f} {pico:14.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+"""Funções compartilhadas pelos benchmarks."""
+
+import subprocess
+import time
+
+import numpy as np
+
+
+def reamostrar(df, n, semente=0):
+    """Sorteia ``n`` linhas do DataFrame com reposição.
+
+    O resultado não tem versão (``attrs`` vazio), então nada calculado sobre
+    ele é memorizado e cada medição faz a conta inteira.
+    """
+    indices = np.random.default_rng(semente).integers(0, len(df), n)
+    amostra = df.iloc[indices].reset_index(drop=True)
+    amostra.attrs = {}
+    return amostra
+
+
+def cronometrar(funcao, *args):
+    inicio = time.perf_counter()
+    resultado = funcao(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def commit_atual():
+    """Hash curto do commit em que o código está (com ``+`` se houver mudanças não commitadas)."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        sujo = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+' if sujo else '')
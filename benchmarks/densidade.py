@@ -0,0 +1,107 @@
+"""Compara o KDE com binning/FFT (``analise.densidade``) com o ``gaussian_kde`` do SciPy.
+
+Para cada superfície 2-D do dashboard (seções 5.1, 5.2 e 7) mede o tempo das
+duas implementações em dados reamostrados do CSV e confere se o erro máximo
+relativo fica dentro da tolerância. Sai com código 1 se a tolerância for
+violada.
+
+Com ``--verificar``, só confere a precisão, rápido e sem sorteio diferente a
+cada execução: as superfícies 2-D e as densidades 1-D por grupo
+(``densidades_por_grupo``, o caminho em lote da seção 5.3) contra um
+``gaussian_kde`` por grupo, em 2000 linhas reamostradas com semente fixa.
+
+    python -m benchmarks.densidade --tamanhos 10000 1000000 10000000
+    python -m benchmarks.densidade --verificar
+"""
+
+import argparse
+import sys
+
+import numpy as np
+from scipy.stats import gaussian_kde
+
+from analise.dados import carregar_dados
+from analise.densidade import densidade_2d, densidades_por_grupo
+from analise.secoes import HORAS_SONO, SUPERFICIES
+from benchmarks.comum import cronometrar, reamostrar
+
+
+def kde_scipy(x, y, eixo_x, eixo_y):
+    kde = gaussian_kde(np.vstack([x, y]))
+    x_grid, y_grid = np.meshgrid(eixo_x, eixo_y)
+    return kde(np.vstack([x_grid.ravel(), y_grid.ravel()])).reshape(x_grid.shape)
+
+
+def verificar(df, tolerancia, linhas=2000):
+    """Erro máximo relativo de cada densidade contra o SciPy, em dados fixos; devolve ``True`` se passou."""
+    dados = reamostrar(df, linhas, semente=0)
+    erros = {}
+    for secao, (coluna_x, coluna_y, eixo_x, eixo_y) in SUPERFICIES.items():
+        eixo_x, eixo_y = np.linspace(*eixo_x), np.linspace(*eixo_y)
+        x = dados[coluna_x].to_numpy(np.float64)
+        y = dados[coluna_y].to_numpy(np.float64)
+        z_ref = kde_scipy(x, y, eixo_x, eixo_y)
+        erros[f'2-D {secao}'] = np.abs(densidade_2d(x, y, eixo_x, eixo_y) - z_ref).max() / z_ref.max()
+
+    eixo = np.linspace(dados['Exam_Score'].min(), dados['Exam_Score'].max(), 500)
+    por_grupo = densidades_por_grupo(dados, 'Sleep_Hours', 'Exam_Score', eixo)
+    for horas in HORAS_SONO:
+        notas = dados.loc[dados['Sleep_Hours'] == horas, 'Exam_Score'].to_numpy(np.float64)
+        ref = gaussian_kde(notas)(eixo)
+        erros[f'1-D sono={horas}'] = np.abs(por_grupo.loc[horas].to_numpy() - ref).max() / ref.max()
+
+    print(f"{'densidade':>14} {'erro rel.':>10}")
+    for nome, erro in erros.items():
+        print(f'{nome:>14} {erro:10.2e}')
+    return max(erros.values()) <= tolerancia
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10**4, 10**6, 10**7])
+    parser.add_argument('--max-scipy', type=int, default=10**6,
+                        help='acima desse tamanho o tempo do SciPy é estimado por extrapolação linear')
+    parser.add_argument('--tolerancia', type=float, default=1e-2,
+                        help='erro máximo relativo ao pico da densidade')
+    parser.add_argument('--verificar', action='store_true',
+                        help='só confere a precisão contra o SciPy em 2000 linhas fixas (sem medir tempo)')
+    args = parser.parse_args(argv)
+
+    df = carregar_dados(args.csv)
+    if args.verificar:
+        if not verificar(df, args.tolerancia):
+            print(f'ERRO: diferença acima da tolerância de {args.tolerancia:g}', file=sys.stderr)
+            return 1
+        return 0
+    falhou = False
+    print(f"{'seção':>5} {'linhas':>10} {'scipy (s)':>11} {'fft (s)':>9} {'ganho':>8} {'erro rel.':>10}")
+    for tamanho in args.tamanhos:
+        dados = reamostrar(df, tamanho)
+        for secao, (coluna_x, coluna_y, eixo_x, eixo_y) in SUPERFICIES.items():
+            eixo_x, eixo_y = np.linspace(*eixo_x), np.linspace(*eixo_y)
+            x = dados[coluna_x].to_numpy(np.float64)
+            y = dados[coluna_y].to_numpy(np.float64)
+            z_fft, t_fft = cronometrar(densidade_2d, x, y, eixo_x, eixo_y)
+
+            if tamanho <= args.max_scipy:
+                z_ref, t_ref = cronometrar(kde_scipy, x, y, eixo_x, eixo_y)
+                erro = np.abs(z_fft - z_ref).max() / z_ref.max()
+                falhou |= erro > args.tolerancia
+                texto_ref, texto_erro = f'{t_ref:11.3f}', f'{erro:10.2e}'
+            else:
+                # Custo do gaussian_kde cresce linearmente com o número de linhas
+                amostra = max(1, args.max_scipy // 100)
+                _, t_amostra = cronometrar(kde_scipy, x[:amostra], y[:amostra], eixo_x, eixo_y)
+                t_ref = t_amostra * tamanho / amostra
+                texto_ref, texto_erro = f'~{t_ref:10.1f}', f"{'-':>10}"
+            print(f'{secao:>5} {tamanho:>10} {texto_ref} {t_fft:9.3f} {t_ref / t_fft:7.0f}x {texto_erro}')
+
+    if falhou:
+        print(f'ERRO: diferença acima da tolerância de {args.tolerancia:g}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Gera um arquivo sintético com o esquema do CSV para testes de carga.
+
+O modelo (``analise.sintetico``) é ajustado ao CSV original; em seguida as
+linhas são geradas em pedaços paralelos e gravadas em CSV ou Parquet. Ao
+final é mostrado quanto o primeiro pedaço se afasta do original nas
+frequências das colunas e na matriz de correlação.
+
+    python -m benchmarks.gerar_dados --linhas 10000000 --saida dados/grande.csv
+    python -m benchmarks.gerar_dados --linhas 100000000 --saida dados/grande.parquet --processos 8
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from analise.correlacao import matriz_correlacao
+from analise.dados import ESQUEMA, carregar_dados
+from analise.sintetico import TAMANHO_CHUNK, ModeloSintetico, gravar
+
+
+def diferencas(original, sintetico):
+    """Maior diferença nas frequências de cada coluna e na matriz de correlação."""
+    frequencias = max(
+        (original[c].value_counts(normalize=True, dropna=False)
+         .sub(sintetico[c].value_counts(normalize=True, dropna=False), fill_value=0).abs().max())
+        for c in ESQUEMA
+    )
+    correlacoes = np.abs(matriz_correlacao(original).to_numpy() - matriz_correlacao(sintetico).to_numpy())
+    return frequencias, np.nanmax(correlacoes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv', help='CSV usado para ajustar o modelo')
+    parser.add_argument('--linhas', type=int, required=True)
+    parser.add_argument('--saida', required=True, help='arquivo .csv ou .parquet')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--tamanho-chunk', type=int, default=TAMANHO_CHUNK)
+    parser.add_argument('--processos', type=int, help='padrão: número de CPUs')
+    args = parser.parse_args(argv)
+
+    original = carregar_dados(args.csv)
+    modelo = ModeloSintetico.ajustar(original, args.semente)
+
+    inicio = time.perf_counter()
+    destino = gravar(modelo, args.saida, args.linhas, args.semente, args.tamanho_chunk, args.processos)
+    tempo = time.perf_counter() - inicio
+    tamanho = destino.stat().st_size
+    print(f'{args.linhas} linhas gravadas em {destino} ({tamanho / 2**20:.1f} MB) em {tempo:.1f} s: '
+          f'{args.linhas / tempo:.3g} linhas/s, {tamanho / 2**20 / tempo:.0f} MB/s')
+
+    if args.linhas == 0:
+        return 0
+    amostra = modelo.gerar(min(args.linhas, args.tamanho_chunk), args.semente)
+    frequencias, correlacoes = diferencas(original, amostra)
+    print(f'maior diferença de frequência: {frequencias:.4f}; de correlação: {correlacoes:.4f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Mede o tempo de importação do dashboard e dos módulos de ``analise``.
+
+Cada alvo é importado num processo novo com ``python -X importtime`` (melhor
+de ``--repeticoes``). O alvo ``dashboard`` são as importações do topo de
+``TrabalhoFinalOrgDados.py``, ou seja, o que uma sessão nova paga antes de
+mostrar qualquer coisa. Além do tempo total, são listados os módulos mais
+caros e verificado que nenhum módulo de ``--proibidos`` (bibliotecas que
+só as seções usam) é carregado na partida. Com ``--comparar``, o código de
+saída é 1 se algum alvo ficou mais lento que o limite ou se algum módulo
+proibido foi importado.
+
+    python -m benchmarks.importacao
+    python -m benchmarks.importacao --comparar .cache/benchmarks/importacao-abc1234.json
+"""
+
+import argparse
+import ast
+import datetime
+import json
+import platform
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.comum import commit_atual
+
+DASHBOARD = Path(__file__).resolve().parent.parent / 'TrabalhoFinalOrgDados.py'
+
+ALVOS = ['dashboard', 'analise.secoes', 'analise.filtros', 'analise.pre_calculo', 'analise.graficos']
+
+# Carregados só quando uma seção precisa deles (o plotly.graph_objects não entra:
+# o próprio Streamlit o importa, e no Plotly 6+ ele é carregado aos poucos)
+PROIBIDOS = ['scipy.signal', 'scipy.stats', 'sklearn', 'seaborn', 'matplotlib.pyplot', 'plotly.express',
+             'mpl_toolkits.mplot3d']
+
+
+def importacoes_do_dashboard(caminho=DASHBOARD):
+    """As instruções ``import`` do nível mais alto do script, como código."""
+    arvore = ast.parse(caminho.read_text(encoding='utf-8'))
+    return '\n'.join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def _ler_importtime(saida):
+    """Linhas do ``-X importtime`` -> ``{modulo: (proprio_us, acumulado_us, nivel)}``."""
+    modulos = {}
+    for linha in saida.splitlines():
+        if not linha.startswith('import time:') or 'self [us]' in linha:
+            continue
+        proprio, acumulado, nome = linha.removeprefix('import time:').split('|')
+        nome = nome[1:]
+        nivel = (len(nome) - len(nome.lstrip(' '))) // 2
+        modulos[nome.strip()] = (int(proprio), int(acumulado), nivel)
+    return modulos
+
+
+def medir(alvo, repeticoes=5):
+    """Importa ``alvo`` em processos novos e devolve os módulos da execução mais rápida."""
+    codigo = importacoes_do_dashboard() if alvo == 'dashboard' else f'import {alvo}'
+    melhor = None
+    for _ in range(repeticoes):
+        processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo],
+                                  capture_output=True, text=True, check=True, cwd=DASHBOARD.parent)
+        modulos = _ler_importtime(processo.stderr)
+        total = sum(proprio for proprio, _, _ in modulos.values())
+        if melhor is None or total < melhor[0]:
+            melhor = (total, modulos)
+    return melhor
+
+
+def executar(alvos, repeticoes, proibidos, mais_caros):
+    resultados = []
+    for alvo in alvos:
+        total, modulos = medir(alvo, repeticoes)
+        carregados = [m for m in proibidos if m in modulos]
+        # Tempo próprio somado por pacote raiz (pandas, numpy, streamlit, ...)
+        por_pacote = {}
+        for nome, (proprio, _, _) in modulos.items():
+            raiz = nome.split('.')[0]
+            por_pacote[raiz] = por_pacote.get(raiz, 0) + proprio
+        topo = sorted(por_pacote.items(), key=lambda m: -m[1])[:mais_caros]
+        resultados.append({'alvo': alvo, 'tempo_s': total / 1e6, 'modulos': len(modulos),
+                           'mais_caros': [{'pacote': n, 'tempo_s': t / 1e6} for n, t in topo],
+                           'proibidos': carregados})
+        print(f'{alvo:<22} {total / 1e3:9.1f} ms  {len(modulos):5} módulos')
+        for nome, tempo in topo:
+            print(f'    {nome:<30} {tempo / 1e3:9.1f} ms')
+        if carregados:
+            print(f"    importados na partida: {', '.join(carregados)}")
+    return resultados
+
+
+def comparar(resultados, anterior, limite):
+    """Mostra a razão de tempo em relação a ``anterior``; devolve os alvos acima de ``limite``."""
+    antigos = {r['alvo']: r for r in anterior['resultados']}
+    piores = []
+    print(f"\ncomparação com {anterior.get('commit')} (razão de tempo; > {limite:g} é regressão)")
+    for r in resultados:
+        antigo = antigos.get(r['alvo'])
+        if antigo is None:
+            continue
+        razao = r['tempo_s'] / antigo['tempo_s']
+        marca = '  <-- mais lento' if razao > limite else ''
+        print(f"{r['alvo']:<22} {razao:6.2f}x{marca}")
+        if razao > limite:
+            piores.append(r)
+    return piores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--alvos', nargs='+', default=ALVOS, help="módulos ou 'dashboard'")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--proibidos', nargs='*', default=PROIBIDOS,
+                        help='módulos que não podem ser importados por nenhum alvo')
+    parser.add_argument('--mais-caros', type=int, default=6, help='pacotes listados por alvo')
+    parser.add_argument('--saida', type=Path,
+                        help='JSON com os resultados (padrão: .cache/benchmarks/importacao-<commit>.json)')
+    parser.add_argument('--comparar', type=Path, help='JSON de uma execução anterior')
+    parser.add_argument('--limite', type=float, default=1.25,
+                        help='razão de tempo acima da qual um alvo conta como regressão')
+    args = parser.parse_args(argv)
+
+    resultados = executar(args.alvos, args.repeticoes, args.proibidos, args.mais_caros)
+
+    commit = commit_atual()
+    relatorio = {
+        'commit': commit,
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {'python': platform.python_version(), 'maquina': platform.machine(),
+                     'sistema': platform.platform()},
+        'repeticoes': args.repeticoes,
+        'resultados': resultados,
+    }
+    saida = args.saida or Path('.cache', 'benchmarks', f"importacao-{commit or 'local'}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    print(f'\nresultados gravados em {saida}')
+
+    falhou = any(r['proibidos'] for r in resultados)
+    if args.comparar is not None:
+        anterior = json.loads(args.comparar.read_text(encoding='utf-8'))
+        falhou = bool(comparar(resultados, anterior, args.limite)) or falhou
+    return 1 if falhou else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
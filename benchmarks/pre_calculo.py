@@ -0,0 +1,53 @@
+"""Tempo de pré-calcular todas as seções em série e no pool de processos.
+
+Os dados são sintéticos (``analise.sintetico``); para cada quantidade de
+processos a memorização é limpa e o pré-cálculo é feito do zero. O tempo
+inclui iniciar os processos e copiar as colunas para a memória compartilhada.
+
+    python -m benchmarks.pre_calculo --linhas 10000000 --processos 1 4 8 16 32
+"""
+
+import argparse
+import inspect
+import sys
+import time
+
+import pandas as pd
+
+from analise.dados import carregar_dados
+from analise.pre_calculo import TAREFAS, pre_calcular
+from analise.sintetico import ModeloSintetico
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv')
+    parser.add_argument('--linhas', type=int, default=10**6)
+    parser.add_argument('--processos', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args(argv)
+
+    modelo = ModeloSintetico.ajustar(carregar_dados(args.csv))
+    df = pd.concat([modelo.gerar(min(250_000, args.linhas - i), pedaco=i // 250_000)
+                    for i in range(0, args.linhas, 250_000)], ignore_index=True)
+    df.attrs['versao'] = f'benchmark-{args.linhas}'
+
+    print(f"{'processos':>9} {'tempo (s)':>10} {'ganho':>7}")
+    serie = None
+    for processos in args.processos:
+        for tarefa in TAREFAS:
+            tarefa.funcao.limpar()
+        inicio = time.perf_counter()
+        if processos == 1:
+            for tarefa in TAREFAS:
+                inspect.unwrap(tarefa.funcao)(df, *tarefa.argumentos)
+        else:
+            pre_calcular(df, processos)
+        tempo = time.perf_counter() - inicio
+        serie = serie or (tempo if processos == 1 else None)
+        ganho = f'{serie / tempo:6.1f}x' if serie else f"{'-':>7}"
+        print(f'{processos:>9} {tempo:10.2f} {ganho}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
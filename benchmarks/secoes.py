@@ -0,0 +1,183 @@
+"""Mede o custo de cada seção do dashboard em dados de vários tamanhos.
+
+Cada cálculo de ``analise.secoes`` (histogramas, médias por grupo,
+tabelas cruzadas, superfícies 2-D, densidades por grupo e matriz
+correlacional) é executado sem memorização sobre dados sintéticos gerados a
+partir do CSV (``analise.sintetico``) ou reamostrados dele, a partir do
+DataFrame, dos ``Agregados`` do modo por partes e do banco SQLite
+(``analise.banco``; cada chamada usa um ``Banco`` novo, sem as contagens já
+consultadas).
+Para cada um são medidos o tempo (melhor de ``--repeticoes``), o pico de
+memória alocada durante a chamada (``tracemalloc``) e a vazão em linhas por
+segundo. Os resultados vão para um JSON; com ``--comparar`` as medições são
+confrontadas com um JSON anterior e o código de saída é 1 se alguma seção
+ficou mais lenta que o limite.
+
+    python -m benchmarks.secoes --tamanhos 10000 100000 1000000 10000000
+    python -m benchmarks.secoes --comparar .cache/benchmarks/secoes-abc1234.json
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from analise import secoes
+from analise.agregados import Agregados
+from analise.banco import Banco
+from analise.dados import carregar_dados
+from analise.secoes import SUPERFICIES
+from analise.sintetico import ModeloSintetico
+from benchmarks.comum import commit_atual, reamostrar
+
+# (nome, função sem memorização, argumentos extras)
+CALCULOS = [
+    ('1 frequencia_notas', secoes.frequencia_notas.__wrapped__, ()),
+    ('2 medias_por_escola', secoes.medias_por_escola.__wrapped__, ()),
+    ('2 diferenca_por_escola', secoes.diferenca_por_escola.__wrapped__, ()),
+    ('2 recursos_por_escola', secoes.recursos_por_escola.__wrapped__, ()),
+    ('3 medias_por_internet', secoes.medias_por_internet.__wrapped__, ()),
+    ('3 diferenca_por_internet', secoes.diferenca_por_internet.__wrapped__, ()),
+    ('3 recursos_por_dificuldade', secoes.recursos_por_dificuldade.__wrapped__, ()),
+    ('3 reforco', secoes.reforco.__wrapped__, ()),
+    ('4 distribuicao_notas', secoes.distribuicao_notas.__wrapped__, ()),
+    *[(f'{secao} superficie', secoes.superficie.__wrapped__, argumentos)
+      for secao, argumentos in SUPERFICIES.items()],
+    ('5.3 densidades_notas_por_sono', secoes.densidades_notas_por_sono.__wrapped__, ()),
+    ('6 correlacao', secoes.correlacao.__wrapped__, ()),
+]
+
+MODOS = ['dataframe', 'agregados', 'sqlite']
+
+
+def medir(funcao, *args, repeticoes=3):
+    """Melhor tempo em ``repeticoes`` chamadas e pico de memória (bytes) de uma chamada extra."""
+    tempo = float('inf')
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempo = min(tempo, time.perf_counter() - inicio)
+    # O tracemalloc deixa as alocações mais lentas, por isso o pico é medido à parte
+    tracemalloc.start()
+    try:
+        funcao(*args)
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return tempo, pico
+
+
+def gerador(df, dados):
+    """Função ``n -> DataFrame`` que produz os dados de cada tamanho."""
+    if dados == 'reamostrado':
+        return lambda n: reamostrar(df, n)
+    return ModeloSintetico.ajustar(df).gerar
+
+
+def _em_banco_novo(funcao):
+    return lambda banco, *argumentos: funcao(Banco(banco.caminho, banco.meta), *argumentos)
+
+
+def executar(gerar, tamanhos, modos, repeticoes):
+    resultados = []
+    temporaria = tempfile.TemporaryDirectory()
+    print(f"{'modo':<10} {'linhas':>10} {'cálculo':<32} {'tempo (ms)':>11} {'pico (MB)':>10} {'linhas/s':>12}")
+    for tamanho in tamanhos:
+        dados = gerar(tamanho)
+        for modo in modos:
+            calculos = CALCULOS
+            if modo == 'agregados':
+                # A agregação é o custo de entrada do modo por partes; as seções usam o resultado
+                calculos = [('0 agregacao', Agregados.de_dataframe, ())] + CALCULOS
+                base = Agregados.de_dataframe(dados)
+            elif modo == 'sqlite':
+                # Montar o banco é o custo de entrada; os cálculos só consultam
+                destino = Path(temporaria.name, f'{tamanho}.sqlite')
+                calculos = [('0 montagem', lambda df: Banco.de_dataframe(df, destino), ())]
+                calculos += [(nome, _em_banco_novo(funcao), argumentos) for nome, funcao, argumentos in CALCULOS]
+                base = Banco.de_dataframe(dados, destino)
+            else:
+                base = dados
+            for nome, funcao, argumentos in calculos:
+                alvo = dados if nome in ('0 agregacao', '0 montagem') else base
+                tempo, pico = medir(funcao, alvo, *argumentos, repeticoes=repeticoes)
+                resultados.append({
+                    'modo': modo, 'linhas': tamanho, 'calculo': nome, 'tempo_s': tempo,
+                    'pico_bytes': pico, 'linhas_por_s': tamanho / tempo,
+                })
+                print(f'{modo:<10} {tamanho:>10} {nome:<32} {tempo * 1e3:11.2f} '
+                      f'{pico / 2**20:10.1f} {tamanho / tempo:12.3g}')
+    temporaria.cleanup()
+    return resultados
+
+
+def comparar(resultados, anterior, limite):
+    """Mostra a razão de tempo em relação a ``anterior``; devolve as medições acima de ``limite``."""
+    chave = lambda r: (r['modo'], r['linhas'], r['calculo'])
+    antigos = {chave(r): r for r in anterior['resultados']}
+    piores = []
+    print(f"\ncomparação com {anterior.get('commit')} (razão de tempo; > {limite:g} é regressão)")
+    for r in resultados:
+        antigo = antigos.get(chave(r))
+        if antigo is None:
+            continue
+        razao = r['tempo_s'] / antigo['tempo_s']
+        marca = '  <-- mais lento' if razao > limite else ''
+        print(f"{r['modo']:<10} {r['linhas']:>10} {r['calculo']:<32} {razao:6.2f}x "
+              f"memória {r['pico_bytes'] / max(antigo['pico_bytes'], 1):6.2f}x{marca}")
+        if razao > limite:
+            piores.append(r)
+    return piores
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv')
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10**4, 10**5, 10**6, 10**7])
+    parser.add_argument('--modos', nargs='+', choices=MODOS, default=MODOS)
+    parser.add_argument('--dados', choices=['sintetico', 'reamostrado'], default='sintetico')
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', type=Path,
+                        help='JSON com os resultados (padrão: .cache/benchmarks/secoes-<commit>.json)')
+    parser.add_argument('--comparar', type=Path, help='JSON de uma execução anterior')
+    parser.add_argument('--limite', type=float, default=1.25,
+                        help='razão de tempo acima da qual uma seção conta como regressão')
+    args = parser.parse_args(argv)
+
+    df = carregar_dados(args.csv)
+    resultados = executar(gerador(df, args.dados), args.tamanhos, args.modos, args.repeticoes)
+
+    commit = commit_atual()
+    relatorio = {
+        'commit': commit,
+        'data': datetime.datetime.now().isoformat(timespec='seconds'),
+        'ambiente': {
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'maquina': platform.machine(), 'sistema': platform.platform(),
+        },
+        'dados': args.dados,
+        'repeticoes': args.repeticoes,
+        'resultados': resultados,
+    }
+    saida = args.saida or Path('.cache', 'benchmarks', f"secoes-{commit or 'local'}.json")
+    saida.parent.mkdir(parents=True, exist_ok=True)
+    saida.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    print(f'\nresultados gravados em {saida}')
+
+    if args.comparar is not None:
+        anterior = json.loads(args.comparar.read_text(encoding='utf-8'))
+        if comparar(resultados, anterior, args.limite):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
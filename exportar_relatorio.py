@@ -0,0 +1,97 @@
+"""Exporta o relatório do dashboard para uma pasta, sem abrir o Streamlit.
+
+Tabelas em CSV/Parquet e figuras em HTML/JSON/PNG (o PNG do Plotly precisa
+do ``kaleido``). Rodar de novo só regrava as seções cujas entradas mudaram.
+Com ``--por`` é gravado um relatório por valor da coluna, em subpastas
+``COLUNA=valor``, com os grupos divididos entre processos. Com ``--sqlite``
+as agregações rodam no banco SQLite do CSV (``analise.banco``), que todos os
+processos compartilham.
+
+    python exportar_relatorio.py --saida relatorio
+    python exportar_relatorio.py --saida relatorios --por School_Type --tabelas csv parquet --figuras html json
+    python exportar_relatorio.py --filtro Gender=Female --filtro Family_Income=Low,Medium
+    python exportar_relatorio.py --sqlite --por Family_Income
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analise.agregados import agregar_csv
+from analise.banco import Banco
+from analise.dados import carregar_dados
+from analise.filtros import COLUNAS_FILTRAVEIS, ROTULOS_FILTRAVEIS, filtrar
+from analise.relatorio import FORMATOS_FIGURA, FORMATOS_TABELA, exportar
+
+
+def _filtro(texto):
+    coluna, _, valores = texto.partition('=')
+    if coluna not in COLUNAS_FILTRAVEIS or not valores:
+        raise argparse.ArgumentTypeError(f'use COLUNA=valor1,valor2 com uma destas colunas: {COLUNAS_FILTRAVEIS}')
+    return coluna, valores.split(',')
+
+
+def _dados(csv, filtros, sqlite):
+    if sqlite:
+        return Banco.abrir(csv).filtrar(filtros)
+    return filtrar(carregar_dados(csv), filtros)
+
+
+def _exportar_grupo(csv, filtros, sqlite, destino, formatos_tabela, formatos_figura):
+    """Um relatório de ``--por``, num processo do pool (o dataset vem do cache ``.npz`` ou do banco)."""
+    return exportar(_dados(csv, filtros, sqlite), destino, formatos_tabela, formatos_figura)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--csv', default='StudentPerformanceFactors.csv')
+    parser.add_argument('--saida', default='relatorio', help='pasta de destino')
+    parser.add_argument('--tabelas', nargs='+', choices=FORMATOS_TABELA, default=['csv'])
+    parser.add_argument('--figuras', nargs='+', choices=FORMATOS_FIGURA, default=['html'])
+    parser.add_argument('--filtro', type=_filtro, action='append', default=[], metavar='COLUNA=V1,V2',
+                        help='restringe os alunos (pode repetir; valores da mesma coluna são somados)')
+    parser.add_argument('--por', choices=COLUNAS_FILTRAVEIS, metavar='COLUNA',
+                        help='um relatório para cada valor da coluna')
+    parser.add_argument('--streaming', action='store_true',
+                        help='lê o CSV em pedaços e usa só os agregados (sem filtros nem --por)')
+    parser.add_argument('--sqlite', action='store_true',
+                        help='calcula as seções com consultas ao banco SQLite do CSV (montado na primeira vez)')
+    parser.add_argument('--processos', type=int, help='padrão: número de CPUs')
+    args = parser.parse_args(argv)
+
+    if args.streaming and (args.filtro or args.por):
+        parser.error('--filtro e --por precisam das linhas do dataset e não funcionam com --streaming')
+    if args.streaming and args.sqlite:
+        parser.error('use --streaming ou --sqlite, não os dois')
+    processos = args.processos or os.cpu_count() or 1
+    filtros = {}
+    for coluna, valores in args.filtro:
+        filtros.setdefault(coluna, []).extend(valores)
+
+    inicio = time.perf_counter()
+    if args.streaming:
+        resultados = {args.saida: exportar(agregar_csv(args.csv), args.saida, args.tabelas, args.figuras)}
+    elif args.por is None:
+        dados = _dados(args.csv, filtros, args.sqlite)
+        resultados = {args.saida: exportar(dados, args.saida, args.tabelas, args.figuras, processos)}
+    else:
+        # Carrega (ou monta o banco) uma vez aqui, para que os processos encontrem o cache pronto
+        _dados(args.csv, {}, args.sqlite)
+        grupos = {os.path.join(args.saida, f'{args.por}={valor}'): {**filtros, args.por: [valor]}
+                  for valor in ROTULOS_FILTRAVEIS[args.por]}
+        with ProcessPoolExecutor(min(processos, len(grupos))) as executor:
+            futuros = {destino: executor.submit(_exportar_grupo, args.csv, filtros_grupo, args.sqlite, destino,
+                                                args.tabelas, args.figuras)
+                       for destino, filtros_grupo in grupos.items()}
+            resultados = {destino: futuro.result() for destino, futuro in futuros.items()}
+
+    for destino, (gravadas, puladas) in resultados.items():
+        print(f'{destino}: {len(gravadas)} seções gravadas, {len(puladas)} sem mudanças')
+    print(f'{time.perf_counter() - inicio:.1f} s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Carga do CSV enquanto outro processo ainda está acrescentando linhas."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from analise.dados import carregar_dados
+
+CSV = Path(__file__).resolve().parent.parent / 'StudentPerformanceFactors.csv'
+
+
+@pytest.fixture
+def csv(tmp_path):
+    """Cópia das primeiras linhas do dataset; devolve o caminho e as linhas (sem o cabeçalho)."""
+    linhas = CSV.read_bytes().splitlines(keepends=True)[:101]
+    destino = tmp_path / 'dados.csv'
+    destino.write_bytes(b''.join(linhas))
+    return destino, linhas[1:]
+
+
+def test_linha_pela_metade_na_primeira_carga(csv):
+    caminho, linhas = csv
+    with open(caminho, 'ab') as f:
+        f.write(linhas[0][:12])
+    assert len(carregar_dados(caminho)) == len(linhas)
+
+
+def test_linha_pela_metade_depois_de_carregado(csv):
+    caminho, linhas = csv
+    versao = carregar_dados(caminho).attrs['versao']
+    with open(caminho, 'ab') as f:
+        f.write(linhas[0][:12])
+    df = carregar_dados(caminho)
+    assert len(df) == len(linhas) and df.attrs['versao'] == versao
+
+    # Quando a linha termina, ela entra (e só ela)
+    with open(caminho, 'ab') as f:
+        f.write(linhas[0][12:])
+    df = carregar_dados(caminho)
+    assert len(df) == len(linhas) + 1
+    assert df.iloc[-1].equals(df.iloc[0])
+
+
+def test_linha_pela_metade_com_o_cache_em_disco(csv, tmp_path):
+    caminho, linhas = csv
+    with open(caminho, 'ab') as f:
+        f.write(linhas[0][:12])
+    carregar_dados(caminho)
+
+    # Outro processo (cache em memória vazio) lê o .npz, que guarda só as linhas completas
+    copia = tmp_path / 'outro' / 'dados.csv'
+    copia.parent.mkdir()
+    shutil.copy2(caminho, copia)
+    shutil.copytree(tmp_path / '.cache', copia.parent / '.cache')
+    with open(copia, 'ab') as f:
+        f.write(linhas[0][12:])
+    assert len(carregar_dados(copia)) == len(linhas) + 1